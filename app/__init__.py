@@ -5,24 +5,52 @@ from flask_migrate import Migrate
 from flask_wtf.csrf import CSRFProtect
 from config import config
 from .utils import extract_youtube_id
-from sqlalchemy import inspect
-from flask_migrate import upgrade
-import os
+from .cache import PageCache
+from .instrumentation import RequestInstrumentation
+from .metrics import Metrics
+from .replicas import RoutingSession
+from . import replicas
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 login_manager = LoginManager()
 migrate = Migrate()
 csrf = CSRFProtect()
+page_cache = PageCache()
+instrumentation = RequestInstrumentation()
+metrics = Metrics()
+
+def lift_statement_timeout(connection=None):
+    """
+    Lift DATABASE_STATEMENT_TIMEOUT (config.ProductionConfig) for the current transaction.
+
+    The limit is meant for web requests; rebuilds, exports and dataset loads
+    from the CLI may run longer. SET LOCAL ends with the transaction, so the
+    pooled connection goes back with the limit in place.
+
+    Args:
+        connection: Connection to use; db.session's by default
+    """
+    connection = connection if connection is not None else db.session.connection()
+    if connection.dialect.name == 'postgresql':
+        connection.exec_driver_sql('SET LOCAL statement_timeout = 0')
 
 def create_app(config_name='development'):
     app = Flask(__name__)
     app.config.from_object(config[config_name])
 
+    # app.logger is the "app" logger, with Flask's stderr handler; without a
+    # level, its children would inherit the root's WARNING and drop INFO lines
+    app.logger.setLevel(app.config.get('LOG_LEVEL', 'INFO'))
+
     # Initialize extensions
     db.init_app(app)
     login_manager.init_app(app)
     migrate.init_app(app, db)
     csrf.init_app(app)
+    page_cache.init_app(app)
+    instrumentation.init_app(app)
+    metrics.init_app(app)
+    replicas.init_app(app)
 
     # Configure login manager
     login_manager.login_view = 'auth.login'
@@ -34,18 +62,25 @@ def create_app(config_name='development'):
     def youtube_id_filter(url):
         return extract_youtube_id(url)
 
+    from app.avatars import avatar_url, is_processed
+    app.jinja_env.globals.update(avatar_url=avatar_url, avatar_is_processed=is_processed)
+
     # Register blueprints
     from app.auth import auth_bp
     from app.main import main_bp
     from app.claims import claims_bp
     from app.users import users_bp
     from app.admin import admin_bp
+    from app.media import media_bp
+    from app.api import api_bp
 
     app.register_blueprint(auth_bp, url_prefix='/auth')
     app.register_blueprint(main_bp)
     app.register_blueprint(claims_bp, url_prefix='/claims')
     app.register_blueprint(users_bp, url_prefix='/user')
     app.register_blueprint(admin_bp, url_prefix='/admin')
+    app.register_blueprint(media_bp, url_prefix='/media')
+    app.register_blueprint(api_bp, url_prefix='/api/v1')
 
     # Error handlers
     @app.errorhandler(404)
@@ -64,52 +99,5 @@ def create_app(config_name='development'):
         db.session.rollback()
         return render_template('errors/500.html'), 500
 
-    # Ensure tables and migrations are applied on startup. This helps fresh
-    # deployments (e.g., Render) that don't run `flask db upgrade` automatically.
-    try:
-        with app.app_context():
-            inspector = inspect(db.engine)
-            tables = inspector.get_table_names()
-            if 'levels' not in tables:
-                # Try running migrations first; fall back to create_all().
-                try:
-                    upgrade()
-                except Exception:
-                    db.create_all()
-
-            # Optionally create a default admin user when requested via env var.
-            if os.environ.get('AUTO_CREATE_ADMIN', '0') == '1':
-                # Import here to avoid circular import during module load
-                from app.models import User
-                admin_exists = User.query.filter_by(is_admin=True).first()
-                if not admin_exists:
-                    username = os.environ.get('ADMIN_USERNAME', 'NaterGamer')
-                    email = os.environ.get('ADMIN_EMAIL', 'natergamer@example.com')
-                    password = os.environ.get('ADMIN_PASSWORD', 'Nc522774')
-                    user = User(username=username, email=email, is_admin=True)
-                    user.set_password(password)
-                    db.session.add(user)
-                    db.session.commit()
-
-            # Seed initial levels if none exist
-            from app.models import Level
-            if Level.query.count() == 0:
-                initial_levels = [
-                    {'name': 'Level 1 - Tutorial', 'description': 'Learn the basics', 'difficulty': 'Easy'},
-                    {'name': 'Level 2 - Getting Started', 'description': 'Apply your skills', 'difficulty': 'Easy'},
-                    {'name': 'Level 3 - Intermediate Challenge', 'description': 'Test your abilities', 'difficulty': 'Medium'},
-                    {'name': 'Level 4 - Advanced Tactics', 'description': 'Master complex mechanics', 'difficulty': 'Medium'},
-                    {'name': 'Level 5 - Expert Trial', 'description': 'Push your limits', 'difficulty': 'Hard'},
-                    {'name': 'Level 6 - Nightmare Mode', 'description': 'Only for the best', 'difficulty': 'Hard'},
-                ]
-                for level_data in initial_levels:
-                    level = Level(**level_data)
-                    level.update_points()
-                    db.session.add(level)
-                db.session.commit()
-    except Exception:
-        # If creation/migration fails, allow the app to start and surface errors.
-        pass
-
     return app
 
@@ -1,6 +1,9 @@
 from functools import wraps
 from flask import abort, flash, redirect, url_for
 from flask_login import current_user
+from sqlalchemy import select
+from app.models import User
+from app import db
 
 def admin_required(f):
     """Decorator to restrict access to admin users only."""
@@ -9,7 +12,11 @@ def admin_required(f):
         if not current_user.is_authenticated:
             flash('Please log in to access this page.', 'warning')
             return redirect(url_for('auth.login'))
-        if not current_user.is_admin:
+        # current_user may come from the identity cache; revoked rights must
+        # take effect at once in every worker, so ask the database
+        is_admin = current_user.is_admin and db.session.scalar(
+            select(User.is_admin).where(User.id == current_user.id))
+        if not is_admin:
             flash('You do not have permission to access this page.', 'danger')
             abort(403)
         return f(*args, **kwargs)
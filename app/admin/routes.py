@@ -1,43 +1,73 @@
-from flask import render_template, redirect, url_for, flash, request, jsonify
+from flask import render_template, redirect, url_for, flash, request, jsonify, abort, Response, stream_with_context
 from flask_login import current_user
 from app.admin import admin_bp
 from app.admin.decorators import admin_required
+from app.admin.utils import (RankingError, apply_level_positions, count_duplicate_submissions,
+                             find_duplicate_submissions, load_level_order, move_level, order_levels)
 from app.claims.forms import ReviewClaimForm
-from app.models import Claim, User, Level
-from app import db
+from app.models import Claim, User, Level, UserScore, load_rank, with_rank
+from app.ordering import apply_positions
+from app.users.scores import refresh_user_scores
+from app import db, page_cache
+from app.cache import mark_data_changed
+from app.identity import invalidate_identity
+from app.exports import FORMATS, ExportError, stream_export
+from app.pagination import InvalidCursor, keyset_paginate
+from app.stats import get_site_stats
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload
 from datetime import datetime
 
+ADMIN_PAGE_SIZE = 25
+
+@admin_bp.before_request
+def invalidate_public_pages_on_write():
+    """Every admin write changes public data; bump the page cache version on commit."""
+    if request.method != 'GET':
+        mark_data_changed()
+
 @admin_bp.route('/dashboard')
 @admin_required
 def dashboard():
     """Admin dashboard overview."""
-    pending_count = Claim.query.filter_by(status='pending').count()
-    approved_count = Claim.query.filter_by(status='approved').count()
-    rejected_count = Claim.query.filter_by(status='rejected').count()
-    total_users = User.query.count()
-    total_levels = Level.query.count()
-
-    recent_claims = Claim.query.order_by(Claim.submitted_at.desc()).limit(10).all()
-
-    stats = {
-        'pending_count': pending_count,
-        'approved_count': approved_count,
-        'rejected_count': rejected_count,
-        'total_users': total_users,
-        'total_levels': total_levels
-    }
+    stats = get_site_stats()
+
+    recent_claims = Claim.query.options(joinedload(Claim.user), joinedload(Claim.level))\
+        .order_by(Claim.submitted_at.desc()).limit(10).all()
 
     return render_template('admin/dashboard.html', stats=stats, recent_claims=recent_claims)
 
 @admin_bp.route('/pending-claims')
 @admin_required
 def pending_claims():
-    """View all pending claims."""
-    claims = Claim.query.filter_by(status='pending')\
-        .order_by(Claim.submitted_at.asc())\
-        .all()
+    """View pending claims, oldest first, a page at a time."""
+    level_id = request.args.get('level_id', type=int)
+    username = request.args.get('user', '').strip()
+
+    query = select(Claim)\
+        .options(joinedload(Claim.user), joinedload(Claim.level))\
+        .where(Claim.status == 'pending')
+    if level_id:
+        query = query.where(Claim.level_id == level_id)
+    if username:
+        query = query.join(User, User.id == Claim.user_id).where(User.username == username)
+
+    try:
+        page = keyset_paginate(
+            query,
+            [(Claim.submitted_at, 'asc'), (Claim.id, 'asc')],
+            cursor=request.args.get('cursor'),
+            per_page=ADMIN_PAGE_SIZE
+        )
+    except InvalidCursor:
+        abort(400)
 
-    return render_template('admin/pending_claims.html', claims=claims)
+    levels = db.session.execute(select(Level.id, Level.name).order_by(Level.name)).all()
+
+    duplicate_counts = count_duplicate_submissions(page.items)
+
+    return render_template('admin/pending_claims.html', claims=page.items, next_cursor=page.next_cursor,
+                           levels=levels, level_id=level_id, username=username, duplicate_counts=duplicate_counts)
 
 @admin_bp.route('/review/<int:claim_id>', methods=['GET', 'POST'])
 @admin_required
@@ -52,6 +82,7 @@ def review_claim(claim_id):
 
     if form.validate_on_submit():
         action = form.action.data
+        affected_user_ids = {claim.user_id}
         claim.admin_notes = form.admin_notes.data
         claim.reviewed_by = current_user.id
         claim.reviewed_at = datetime.utcnow()
@@ -89,6 +120,7 @@ def review_claim(claim_id):
 
                 for existing in existing_first_victors:
                     existing.is_first_victor = False
+                    affected_user_ids.add(existing.user_id)
 
                 claim.is_first_victor = True
             else:
@@ -103,27 +135,32 @@ def review_claim(claim_id):
         elif action == 'reject':
             claim.status = 'rejected'
             claim.is_first_victor = False
-            claim.rank = None
-            claim.points = 0
+            claim.position = None
             flash(f'Claim #{claim.id} has been rejected.', 'info')
 
+        refresh_user_scores(affected_user_ids)
         db.session.commit()
         return redirect(url_for('admin.pending_claims'))
 
     # Pre-populate form with current values if editing an already-reviewed claim
     if request.method == 'GET':
-        form.assigned_rank.data = claim.rank
+        form.assigned_rank.data = load_rank(claim).rank
         if claim.is_first_victor:
             form.is_first_victor.data = True
 
-    return render_template('admin/review_claim.html', claim=claim, form=form, rank_info=rank_info)
+    duplicates = find_duplicate_submissions(claim)
+
+    return render_template('admin/review_claim.html', claim=claim, form=form, rank_info=rank_info,
+                           duplicates=duplicates)
 
 @admin_bp.route('/levels')
 @admin_required
 def levels():
     """Manage levels."""
-    all_levels = Level.query.order_by(Level.name).all()
-    return render_template('admin/levels.html', levels=all_levels)
+    all_levels = with_rank(Level.query, Level).order_by(Level.name).all()
+    claim_counts = dict(db.session.execute(
+        select(Claim.level_id, func.count(Claim.id)).group_by(Claim.level_id)).all())
+    return render_template('admin/levels.html', levels=all_levels, claim_counts=claim_counts)
 
 @admin_bp.route('/level/add', methods=['POST'])
 @admin_required
@@ -150,29 +187,19 @@ def add_level():
             return redirect(url_for('admin.levels'))
 
     # Create the level
-    level = Level(name=name, description=description, difficulty=difficulty, rank=rank)
+    level = Level(name=name, description=description, difficulty=difficulty)
     db.session.add(level)
     db.session.flush()  # Get the level ID without committing
 
-    # If rank is provided, shift other levels to make room
+    # If rank is provided, give the new level a position at that rank; the
+    # levels below move down in the derived ranking without being rewritten
     if rank:
-        levels_to_shift_down = Level.query.filter(
-            Level.rank >= rank,
-            Level.rank <= 50,
-            Level.id != level.id
-        ).order_by(Level.rank.asc()).all()
-
-        for lvl in levels_to_shift_down:
-            lvl.rank = lvl.rank + 1
-            if lvl.rank > 50:
-                lvl.rank = None
-                lvl.update_points()
-            else:
-                lvl.update_points()
+        order, level_ids = load_level_order()
+        apply_level_positions(order, move_level(order, level_ids, level.id, rank))
 
-    level.update_points()  # Calculate points from rank
     db.session.commit()
-    flash(f'Level "{name}" has been added (Rank: {rank or "unranked"}, Points: {level.points})!', 'success')
+    load_rank(level)
+    flash(f'Level "{name}" has been added (Rank: {level.rank or "unranked"}, Points: {level.points})!', 'success')
     return redirect(url_for('admin.levels'))
 
 @admin_bp.route('/level/<int:level_id>/update-rank', methods=['POST'])
@@ -195,73 +222,83 @@ def update_level_rank(level_id):
             return jsonify({'success': False, 'message': 'Invalid rank value'}), 400
 
     try:
-        # If setting to unranked
-        if new_rank is None:
-            level.rank = None
-            level.update_points()
-            db.session.commit()
-            return jsonify({
-                'success': True,
-                'message': f'Level "{level.name}" set to unranked',
-                'new_rank': level.rank,
-                'new_points': level.points
-            })
-
-        # Cascading push logic: build a chain of levels that need to move
-        cascade_chain = []
-        current_rank = new_rank
-
-        # Build the chain of levels that will be displaced
-        while current_rank <= 50:
-            # Find the level currently at this rank (excluding the level being updated)
-            displaced_level = Level.query.filter(
-                Level.rank == current_rank,
-                Level.id != level_id
-            ).first()
-
-            if displaced_level:
-                # This level needs to be moved
-                cascade_chain.append(displaced_level)
-                current_rank += 1
-            else:
-                # Found an empty slot, stop cascading
-                break
-
-        # Apply the cascade: move each level in the chain to the next rank
-        for displaced_level in reversed(cascade_chain):
-            new_displaced_rank = displaced_level.rank + 1
-            if new_displaced_rank > 50:
-                # Pushed beyond rank 50, becomes unranked
-                displaced_level.rank = None
-            else:
-                displaced_level.rank = new_displaced_rank
-            displaced_level.update_points()
-
-
-        level.rank = new_rank
-        level.update_points()
-
+        # One SELECT for the whole ordering; only the moved level's row is
+        # written, the other levels' ranks follow from their positions
+        order, level_ids = load_level_order()
+        changes = apply_level_positions(order, move_level(order, level_ids, level.id, new_rank))
         db.session.commit()
 
-        affected_count = len(cascade_chain)
-        if affected_count > 0:
-            message = f'Level "{level.name}" updated to rank {new_rank}. {affected_count} level(s) shifted down.'
+        new_rank = load_rank(level).rank
+        new_points = level.points
+        affected_count = sum(1 for change in changes if change['id'] != level.id)
+        if new_rank is None:
+            message = f'Level "{level.name}" set to unranked'
+        elif affected_count > 0:
+            message = f'Level "{level.name}" updated to rank {new_rank}. {affected_count} other level(s) shifted.'
         else:
             message = f'Level "{level.name}" updated to rank {new_rank}'
 
-        # Finally, assign the new rank to the target level
-
         return jsonify({
             'success': True,
             'message': message,
-            'new_rank': level.rank,
-            'new_points': level.points
+            'new_rank': new_rank,
+            'new_points': new_points,
+            'changes': changes
         })
 
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'message': f'Error updating rank: {str(e)}'}), 500
 
+@admin_bp.route('/levels/reorder', methods=['POST'])
+@admin_required
+def reorder_levels():
+    """
+    Apply a complete level ordering or a batch of moves in one transaction.
+
+    Accepts JSON with either:
+        {"order": [level_id, ...]}  top-to-bottom; the first 50 are ranked
+        {"moves": [{"level_id": id, "rank": 1-50 or null}, ...]}  applied in sequence
+    Returns the list of levels whose rank changed.
+    """
+    data = request.get_json(silent=True) or {}
+    order = data.get('order')
+    moves = data.get('moves')
+
+    if (order is None) == (moves is None):
+        return jsonify({'success': False, 'message': 'Provide either "order" or "moves"'}), 400
+
+    try:
+        current_order, level_ids = load_level_order()
+
+        if order is not None:
+            positions = order_levels(current_order, level_ids, [int(level_id) for level_id in order])
+        else:
+            positions = {}
+            moved_order = current_order
+            for move in moves:
+                rank = move.get('rank')
+                rank = None if rank in ['', 'null', None] else int(rank)
+                step = move_level(moved_order, level_ids, int(move['level_id']), rank)
+                moved_order = apply_positions(moved_order, step)
+                positions.update(step)
+
+        changes = apply_level_positions(current_order, positions)
+        db.session.commit()
+
+    except (RankingError, ValueError, TypeError, KeyError) as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'Invalid reorder request: {str(e)}'}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'Error reordering levels: {str(e)}'}), 500
+
+    return jsonify({
+        'success': True,
+        'message': f'{len(changes)} level(s) updated.',
+        'changes': changes
+    })
+
 @admin_bp.route('/level/<int:level_id>/delete', methods=['POST'])
 @admin_required
 def delete_level(level_id):
@@ -274,6 +311,12 @@ def delete_level(level_id):
         flash(f'Cannot delete level with {claim_count} existing claims.', 'danger')
         return redirect(url_for('admin.levels'))
 
+    # Unrank it first: the levels below move up a rank, and the scores of
+    # their players are refreshed for the points they gain
+    if level.position is not None:
+        order, level_ids = load_level_order()
+        apply_level_positions(order, move_level(order, level_ids, level.id, None))
+
     db.session.delete(level)
     db.session.commit()
     flash(f'Level "{level.name}" has been deleted.', 'success')
@@ -282,9 +325,21 @@ def delete_level(level_id):
 @admin_bp.route('/users')
 @admin_required
 def users():
-    """Manage users."""
-    all_users = User.query.order_by(User.created_at.desc()).all()
-    return render_template('admin/users.html', users=all_users)
+    """Manage users, newest first, a page at a time."""
+    claim_count = select(func.count(Claim.id)).where(Claim.user_id == User.id).scalar_subquery()
+
+    try:
+        page = keyset_paginate(
+            select(User, func.coalesce(UserScore.total_points, 0), claim_count)
+            .outerjoin(UserScore, UserScore.user_id == User.id),
+            [(User.created_at, 'desc'), (User.id, 'desc')],
+            cursor=request.args.get('cursor'),
+            per_page=ADMIN_PAGE_SIZE
+        )
+    except InvalidCursor:
+        abort(400)
+
+    return render_template('admin/users.html', users=page.items, next_cursor=page.next_cursor)
 
 @admin_bp.route('/user/<int:user_id>/delete', methods=['POST'])
 @admin_required
@@ -305,12 +360,11 @@ def delete_user(user_id):
     username = user.username
     claim_count = user.claims.count()
 
-    # Delete user (cascade will delete claims)
+    # Delete user (cascade will delete claims and the leaderboard score row)
+    invalidate_identity(user.id)
     db.session.delete(user)
     db.session.commit()
 
-    # Note: Ranks are now manual, so deleted user's ranks create gaps that admins can fill manually
-
     flash(f'User "{username}" has been deleted along with {claim_count} claims.', 'success')
     return redirect(url_for('admin.users'))
 
@@ -326,6 +380,7 @@ def toggle_admin(user_id):
         return redirect(url_for('admin.users'))
 
     user.is_admin = not user.is_admin
+    invalidate_identity(user.id)
     db.session.commit()
 
     status = 'granted' if user.is_admin else 'revoked'
@@ -339,8 +394,8 @@ def manage_ranks(level_id):
     level = Level.query.get_or_404(level_id)
 
     # Get all approved claims for this level, ordered by current rank
-    claims = Claim.query.filter_by(level_id=level_id, status='approved')\
-        .order_by(Claim.rank.asc().nullslast(), Claim.submitted_at.asc())\
+    claims = with_rank(Claim.query, Claim).filter(Claim.level_id == level_id, Claim.status == 'approved')\
+        .order_by(Claim.position.asc().nullslast(), Claim.submitted_at.asc())\
         .all()
 
     from app.users.utils import get_level_rank_distribution
@@ -380,7 +435,7 @@ def update_rank(claim_id):
         return jsonify({
             'success': True,
             'message': message,
-            'new_rank': claim.rank,
+            'new_rank': load_rank(claim).rank,
             'new_points': claim.points
         })
     else:
@@ -408,9 +463,11 @@ def toggle_first_victor(claim_id):
             existing.is_first_victor = False
 
         claim.is_first_victor = True
+        refresh_user_scores([claim.user_id] + [existing.user_id for existing in existing_first_victors])
         message = f'Claim #{claim.id} marked as First Victor for {claim.level.name}'
     else:
         claim.is_first_victor = False
+        refresh_user_scores([claim.user_id])
         message = f'First Victor status removed from claim #{claim.id}'
 
     db.session.commit()
@@ -420,3 +477,28 @@ def toggle_first_victor(claim_id):
         'message': message,
         'is_first_victor': claim.is_first_victor
     })
+
+@admin_bp.route('/cache-stats')
+@admin_required
+def cache_stats():
+    """Page cache hit/miss counters for this worker process."""
+    return jsonify(page_cache.stats())
+
+@admin_bp.route('/export/<name>.<fmt>')
+@admin_required
+def export(name, fmt):
+    """Stream a full export as CSV or NDJSON, gzipped on the fly when the client accepts it."""
+    gzip = request.accept_encodings['gzip'] > 0
+    try:
+        chunks = stream_export(name, fmt, gzip=gzip)
+    except ExportError:
+        abort(404)
+
+    response = Response(stream_with_context(chunks), mimetype=FORMATS[fmt])
+    response.headers['Content-Disposition'] = \
+        f'attachment; filename="{name}-{datetime.utcnow():%Y%m%d-%H%M%S}.{fmt}"'
+    if gzip:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    response.cache_control.no_store = True
+    return response
@@ -0,0 +1,150 @@
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload
+from app.models import Claim, Level, MAX_RANK
+from app.ordering import apply_positions, place, ranks, reorder, write_positions
+from app.users.scores import refresh_scores_for_levels
+from app import db
+
+
+class RankingError(ValueError):
+    """Raised when a requested level ordering or move is invalid."""
+
+
+def load_level_order(lock=True):
+    """
+    Load every level's ordering key in one query.
+
+    Args:
+        lock: Take row locks (SELECT ... FOR UPDATE) so concurrent reorders
+              serialize instead of interleaving. Ignored on SQLite.
+
+    Returns:
+        tuple: ([(level_id, position)] of positioned levels in order,
+                set of all level IDs)
+    """
+    query = select(Level.id, Level.position).order_by(Level.position, Level.id)
+    if lock:
+        query = query.with_for_update()
+    rows = db.session.execute(query).all()
+    order = [(level_id, position) for level_id, position in rows if position is not None]
+    return order, {level_id for level_id, _ in rows}
+
+
+def move_level(order, level_ids, level_id, new_rank):
+    """
+    Work out the position writes that put a level at a rank.
+
+    The levels from new_rank down all move one slot down in the derived
+    ranking, but only the moved level's row is written.
+
+    Args:
+        order: Current [(level_id, position)] from load_level_order()
+        level_ids: Set of all level IDs
+        level_id: Level being moved
+        new_rank: Target rank 1-MAX_RANK, or None for unranked
+
+    Returns:
+        dict: {level_id: position or None} to write
+    """
+    if level_id not in level_ids:
+        raise RankingError(f'Unknown level #{level_id}')
+    if new_rank is not None and not (1 <= new_rank <= MAX_RANK):
+        raise RankingError(f'Rank must be 1-{MAX_RANK}')
+    return place(order, level_id, new_rank)
+
+
+def order_levels(order, level_ids, ordered_ids):
+    """
+    Work out the position writes for a complete top-to-bottom order of levels.
+
+    The first MAX_RANK levels are ranked 1..MAX_RANK. Levels left out of
+    ordered_ids become unranked.
+
+    Args:
+        order: Current [(level_id, position)] from load_level_order()
+        level_ids: Set of all level IDs
+        ordered_ids: Level IDs in the desired order
+
+    Returns:
+        dict: {level_id: position or None} to write
+    """
+    if len(set(ordered_ids)) != len(ordered_ids):
+        raise RankingError('Each level may appear only once in the ordering')
+    unknown = [level_id for level_id in ordered_ids if level_id not in level_ids]
+    if unknown:
+        raise RankingError(f'Unknown level(s): {", ".join(map(str, unknown))}')
+    return reorder(order, ordered_ids)
+
+
+def apply_level_positions(order, changes):
+    """
+    Persist position changes and return the levels whose displayed rank changed.
+
+    Only the rows in changes are written (a single row for a plain move),
+    but every level whose derived rank shifted is reported so the admin UI
+    can update, and the leaderboard scores of affected players are
+    refreshed. Does not commit.
+
+    Args:
+        order: [(level_id, position)] as loaded
+        changes: {level_id: position or None} to write
+
+    Returns:
+        list: [{'id', 'old_rank', 'rank', 'points'}] for every level whose rank changed
+    """
+    if not changes:
+        return []
+
+    write_positions(Level, changes)
+
+    def displayed(level_order):
+        return {level_id: rank for level_id, rank in ranks(level_order).items() if rank <= MAX_RANK}
+
+    old_ranks = displayed(order)
+    new_ranks = displayed(apply_positions(order, changes))
+    shifted = sorted(level_id for level_id in set(old_ranks) | set(new_ranks)
+                     if old_ranks.get(level_id) != new_ranks.get(level_id))
+
+    refresh_scores_for_levels(shifted)
+
+    return [{
+        'id': level_id,
+        'old_rank': old_ranks.get(level_id),
+        'rank': new_ranks.get(level_id),
+        'points': Level.points_for_rank(new_ranks.get(level_id))
+    } for level_id in shifted]
+
+
+def find_duplicate_submissions(claim):
+    """
+    Other claims for the same YouTube video, oldest first (an index lookup on video_id).
+
+    Returns:
+        list: Claim objects with their user and level loaded
+    """
+    if not claim.video_id:
+        return []
+    return db.session.scalars(
+        select(Claim)
+        .options(joinedload(Claim.user), joinedload(Claim.level))
+        .where(Claim.video_id == claim.video_id, Claim.id != claim.id)
+        .order_by(Claim.submitted_at, Claim.id)
+    ).all()
+
+
+def count_duplicate_submissions(claims):
+    """
+    For a page of claims, how many claims exist per video submitted more than once.
+
+    Returns:
+        dict: {video_id: number of claims} for duplicated videos only
+    """
+    video_ids = {claim.video_id for claim in claims if claim.video_id}
+    if not video_ids:
+        return {}
+    return dict(db.session.execute(
+        select(Claim.video_id, func.count(Claim.id))
+        .where(Claim.video_id.in_(video_ids))
+        .group_by(Claim.video_id)
+        .having(func.count(Claim.id) > 1)
+    ).all())
@@ -0,0 +1,171 @@
+"""
+Read-only JSON API, version 1.
+
+Every endpoint selects only the columns it returns and serializes the
+rows directly, without loading model instances or rendering templates.
+Lists are keyset-paginated: a response's "next" cursor is passed back as
+?cursor= for the following page, and is null on the last one. Responses
+carry an ETag from the data version (app.conditional), so polling
+clients get 304s until something changes.
+"""
+import json
+from datetime import datetime
+from flask import abort, current_app, request
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import aliased
+from app.api import api_bp
+from app.avatars import avatar_url
+from app.conditional import conditional_data
+from app.models import Claim, Level, User, UserScore
+from app.pagination import InvalidCursor, keyset_paginate
+from app.users.utils import get_profile_stats
+from app import db
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+
+
+def _json(payload, status=200):
+    """Compact JSON response; datetimes become ISO 8601 strings."""
+    body = json.dumps(payload, separators=(',', ':'),
+                      default=lambda value: value.isoformat() if isinstance(value, datetime) else str(value))
+    return current_app.response_class(body, status=status, mimetype='application/json')
+
+
+def _page(statement, ordering, keys):
+    """Keyset-paginate statement from the request's cursor and limit; rows become dicts of keys."""
+    limit = min(max(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    try:
+        page = keyset_paginate(statement, ordering, cursor=request.args.get('cursor'), per_page=limit)
+    except InvalidCursor:
+        abort(400, description='Invalid cursor')
+    return [dict(zip(keys, row)) for row in page.items], page.next_cursor
+
+
+@api_bp.errorhandler(400)
+@api_bp.errorhandler(404)
+def api_error(error):
+    return _json({'error': error.description}, error.code)
+
+
+@api_bp.route('/levels')
+@conditional_data
+def levels():
+    """Levels in list order: ranked ones first, then unranked by name."""
+    ranking = Level.ranking()
+    first_claims = select(Claim.level_id, func.min(Claim.id).label('claim_id'))\
+        .where(Claim.status == 'approved', Claim.is_first_victor.is_(True))\
+        .group_by(Claim.level_id).subquery()
+    first_claim = aliased(Claim)
+    first_victor = aliased(User)
+
+    items, next_cursor = _page(
+        select(Level.id, Level.name, Level.difficulty, ranking.c.rank,
+               func.coalesce(ranking.c.points, 0), first_victor.id, first_victor.username, first_claim.video_id)
+        .outerjoin(ranking, ranking.c.id == Level.id)
+        .outerjoin(first_claims, first_claims.c.level_id == Level.id)
+        .outerjoin(first_claim, first_claim.id == first_claims.c.claim_id)
+        .outerjoin(first_victor, first_victor.id == first_claim.user_id),
+        [
+            (case((Level.position.is_(None), 1), else_=0), 'asc'),
+            (func.coalesce(Level.position, ''), 'asc'),
+            (Level.name, 'asc'),
+            (Level.id, 'asc')
+        ],
+        ['id', 'name', 'difficulty', 'rank', 'points', 'first_victor_id', 'first_victor', 'video_id']
+    )
+
+    # Completions only for the levels on this page
+    level_ids = [item['id'] for item in items]
+    completions = dict(db.session.execute(
+        select(Claim.level_id, func.count(Claim.user_id.distinct()))
+        .where(Claim.status == 'approved', Claim.level_id.in_(level_ids))
+        .group_by(Claim.level_id)
+    ).all()) if level_ids else {}
+
+    return _json({
+        'levels': [{
+            'id': item['id'],
+            'name': item['name'],
+            'difficulty': item['difficulty'],
+            'rank': item['rank'],
+            'points': item['points'],
+            'completions': completions.get(item['id'], 0),
+            'first_victor': {'id': item['first_victor_id'], 'username': item['first_victor'],
+                             'video_id': item['video_id']} if item['first_victor_id'] else None
+        } for item in items],
+        'next': next_cursor
+    })
+
+
+@api_bp.route('/leaderboard')
+@conditional_data
+def leaderboard():
+    """Players by total points; tied players share a rank."""
+    items, next_cursor = _page(
+        select(UserScore.user_id, User.username, UserScore.total_points,
+               UserScore.completed_levels, UserScore.first_victor_count)
+        .join(User, User.id == UserScore.user_id),
+        [(UserScore.total_points, 'desc'), (UserScore.user_id, 'asc')],
+        ['id', 'username', 'points', 'completed_levels', 'first_victor_count']
+    )
+
+    # rank = 1 + players with more points, from one grouped count over the
+    # ranking index down to this page's lowest score
+    if items:
+        ahead = 0
+        ahead_of = {}
+        above = db.session.execute(
+            select(UserScore.total_points, func.count())
+            .where(UserScore.total_points >= items[-1]['points'])
+            .group_by(UserScore.total_points)
+            .order_by(UserScore.total_points.desc())
+        ).all()
+        for points, count in above:
+            ahead_of[points] = ahead
+            ahead += count
+        for item in items:
+            item['rank'] = ahead_of[item['points']] + 1
+
+    return _json({'players': items, 'next': next_cursor})
+
+
+def _user_or_404(username):
+    user = db.session.execute(
+        select(User.id, User.username, User.profile_picture, User.created_at).where(User.username == username)
+    ).first()
+    if user is None:
+        abort(404, description='No such user')
+    return user
+
+
+@api_bp.route('/users/<username>')
+@conditional_data
+def user(username):
+    """A player's profile and statistics."""
+    user = _user_or_404(username)
+    return _json({
+        'id': user.id,
+        'username': user.username,
+        'avatar': avatar_url(user.profile_picture, 128),
+        'joined': user.created_at,
+        'stats': get_profile_stats(user.id)
+    })
+
+
+@api_bp.route('/users/<username>/completions')
+@conditional_data
+def user_completions(username):
+    """A player's approved claims, newest first."""
+    user = _user_or_404(username)
+    ranking = Level.ranking()
+    items, next_cursor = _page(
+        select(Claim.id, Claim.level_id, Level.name, ranking.c.rank, func.coalesce(ranking.c.points, 0),
+               Claim.video_id, Claim.is_first_victor, Claim.submitted_at)
+        .join(Level, Level.id == Claim.level_id)
+        .outerjoin(ranking, ranking.c.id == Level.id)
+        .where(Claim.user_id == user.id, Claim.status == 'approved'),
+        [(Claim.submitted_at, 'desc'), (Claim.id, 'desc')],
+        ['id', 'level_id', 'level', 'level_rank', 'points', 'video_id', 'first_victor', 'submitted_at']
+    )
+    return _json({'completions': items, 'next': next_cursor})
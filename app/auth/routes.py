@@ -4,6 +4,8 @@ from app.auth import auth_bp
 from app.auth.forms import RegistrationForm, LoginForm, RequestPasswordResetForm, ResetPasswordForm
 from app.models import User
 from app import db
+from app.cache import mark_data_changed
+from app.identity import invalidate_identity
 
 @auth_bp.route('/register', methods=['GET', 'POST'])
 def register():
@@ -15,6 +17,7 @@ def register():
         user = User(username=form.username.data, email=form.email.data)
         user.set_password(form.password.data)
         db.session.add(user)
+        mark_data_changed()  # Player count on the homepage
         db.session.commit()
         flash('Congratulations, you are now registered! Please log in.', 'success')
         return redirect(url_for('auth.login'))
@@ -87,6 +90,7 @@ def reset_password(token):
     form = ResetPasswordForm()
     if form.validate_on_submit():
         user.set_password(form.password.data)
+        invalidate_identity(user.id)
         db.session.commit()
         flash('Your password has been reset! You can now log in.', 'success')
         return redirect(url_for('auth.login'))
@@ -0,0 +1,227 @@
+"""
+Profile picture processing.
+
+Uploads are streamed into content-addressed storage (app/storage.py)
+under the SHA-256 of their bytes, then decoded, cropped to a square,
+stripped of metadata and re-encoded into a fixed set of small sizes, in
+WebP with a JPEG fallback:
+
+    uploads/originals/<ab>/<sha256>
+    uploads/avatars/<sha256>-32.webp   uploads/avatars/<sha256>-32.jpg
+    uploads/avatars/<sha256>-64.webp   ...
+
+User.profile_picture stores 'avatars/<sha256>'. Identical uploads share
+the same files, so avatar files are never deleted when a user changes
+picture; collect_garbage() removes the ones nobody references any more.
+
+Files are served by the media blueprint (app/media). Older values are
+plain file names of unprocessed uploads; avatar_url() still points at
+those as-is until `flask backfill-avatars` converts them.
+"""
+import io
+import os
+import time
+from flask import current_app, url_for
+from PIL import Image, ImageOps, UnidentifiedImageError
+from app.storage import remove_file, store_stream, write_file
+
+AVATAR_SIZES = (32, 64, 128)
+AVATAR_FORMATS = {'webp': 'WEBP', 'jpg': 'JPEG'}
+AVATAR_DIR = 'avatars'
+ORIGINALS_DIR = 'originals'
+
+# Refuse to decode anything larger than this (decompression bombs)
+MAX_SOURCE_PIXELS = 40_000_000
+
+
+class AvatarError(ValueError):
+    """Raised when an uploaded file can't be turned into an avatar."""
+
+
+def uploads_path(*parts):
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], *parts)
+
+
+def is_processed(picture):
+    return bool(picture) and picture.startswith(AVATAR_DIR + '/')
+
+
+def pick_size(px):
+    """Smallest stored size that covers px, or the largest one."""
+    for size in AVATAR_SIZES:
+        if size >= px:
+            return size
+    return AVATAR_SIZES[-1]
+
+
+def _load(source):
+    try:
+        image = Image.open(source)
+        if image.width * image.height > MAX_SOURCE_PIXELS:
+            raise AvatarError('Image is too large')
+        # Let the JPEG decoder downscale while decoding instead of afterwards
+        image.draft('RGB', (AVATAR_SIZES[-1] * 2, AVATAR_SIZES[-1] * 2))
+        image.seek(0)  # First frame of animated GIFs
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, EOFError) as e:
+        raise AvatarError(f'Could not read image: {e}')
+
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+    else:
+        image = image.convert('RGB')
+    return image
+
+
+def render_avatar(source):
+    """
+    Encode every avatar variant of an image.
+
+    Args:
+        source: Path or binary file object of the uploaded image
+
+    Returns:
+        dict: {(size, extension): encoded bytes}
+    """
+    image = _load(source)
+    master = ImageOps.fit(image, (AVATAR_SIZES[-1], AVATAR_SIZES[-1]), Image.LANCZOS)
+
+    variants = {}
+    for size in AVATAR_SIZES:
+        resized = master if size == master.width else master.resize((size, size), Image.LANCZOS)
+        for extension, image_format in AVATAR_FORMATS.items():
+            if image_format == 'JPEG' and resized.mode == 'RGBA':
+                flattened = Image.new('RGB', resized.size, (255, 255, 255))
+                flattened.paste(resized, mask=resized.getchannel('A'))
+                encoded_image = flattened
+            else:
+                encoded_image = resized
+
+            buffer = io.BytesIO()
+            if image_format == 'JPEG':
+                encoded_image.save(buffer, image_format, quality=85, optimize=True, progressive=True)
+            else:
+                encoded_image.save(buffer, image_format, quality=80, method=6)
+            variants[(size, extension)] = buffer.getvalue()
+    return variants
+
+
+def _variant_paths(digest):
+    directory = uploads_path(AVATAR_DIR)
+    return {(size, extension): os.path.join(directory, f'{digest}-{size}.{extension}')
+            for size in AVATAR_SIZES for extension in AVATAR_FORMATS}
+
+
+def save_avatar(stream):
+    """
+    Store an uploaded image and make sure its avatar variants exist.
+
+    The upload is hashed while it is streamed to disk. If the same bytes
+    were uploaded before, the existing original and variants are reused
+    and nothing is decoded.
+
+    Args:
+        stream: Binary file object of the uploaded image
+
+    Returns:
+        str: Value to store in User.profile_picture
+    """
+    digest, original_path, created = store_stream(stream, uploads_path(ORIGINALS_DIR))
+    paths = _variant_paths(digest)
+
+    if all(os.path.exists(path) for path in paths.values()):
+        # Reused files: refresh their age so a concurrent garbage collection skips them
+        for path in [original_path, *paths.values()]:
+            os.utime(path)
+        return f'{AVATAR_DIR}/{digest}'
+
+    try:
+        variants = render_avatar(original_path)
+    except AvatarError:
+        if created:
+            remove_file(original_path)
+        raise
+
+    os.makedirs(uploads_path(AVATAR_DIR), exist_ok=True)
+    for key, data in variants.items():
+        write_file(paths[key], data)
+
+    return f'{AVATAR_DIR}/{digest}'
+
+
+def collect_garbage(referenced, grace_seconds=3600, dry_run=False):
+    """
+    Delete stored uploads that no profile picture references.
+
+    Covers avatar variants, stored originals, leftover temporary files and
+    unprocessed legacy uploads in the uploads root. Files modified within
+    the grace period are kept, so uploads whose transaction hasn't
+    committed yet are not collected.
+
+    Args:
+        referenced: Iterable of User.profile_picture values in use
+        grace_seconds: Minimum age of a file before it can be deleted
+        dry_run: Only report what would be deleted
+
+    Returns:
+        dict: {'files': number of files removed, 'bytes': bytes freed}
+    """
+    referenced = set(referenced)
+    digests = {picture.split('/', 1)[1] for picture in referenced if is_processed(picture)}
+    cutoff = time.time() - grace_seconds
+    removed = {'files': 0, 'bytes': 0}
+
+    def collect(path, keep):
+        if keep:
+            return
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+        if stat.st_mtime >= cutoff:
+            return
+        removed['files'] += 1
+        removed['bytes'] += stat.st_size if dry_run else remove_file(path)
+
+    def scan(directory):
+        try:
+            return list(os.scandir(directory))
+        except OSError:
+            return []
+
+    for entry in scan(uploads_path(AVATAR_DIR)):
+        collect(entry.path, entry.name.rsplit('-', 1)[0] in digests)
+
+    for fan_out in scan(uploads_path(ORIGINALS_DIR)):
+        if fan_out.is_dir():
+            for entry in scan(fan_out.path):
+                collect(entry.path, entry.name in digests)
+        else:
+            collect(fan_out.path, False)  # Interrupted uploads (.tmp)
+
+    for entry in scan(uploads_path()):
+        if entry.is_file():
+            collect(entry.path, entry.name in referenced)
+
+    return removed
+
+
+def avatar_url(picture, px, extension='jpg', density=1):
+    """
+    URL of the stored avatar variant best suited to a display size.
+
+    Args:
+        picture: User.profile_picture value
+        px: Displayed width/height in CSS pixels
+        extension: 'webp' or 'jpg'
+        density: Device pixel ratio to cover (1 or 2)
+
+    Returns:
+        str: URL, or None if the user has no picture
+    """
+    if not picture:
+        return None
+    if not is_processed(picture):
+        return url_for('media.upload', filename=picture)
+    return url_for('media.upload', filename=f'{picture}-{pick_size(px * density)}.{extension}')
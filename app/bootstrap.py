@@ -0,0 +1,104 @@
+"""
+One-shot database bootstrap.
+
+Creating the schema, the optional default admin and the starter levels
+used to happen inside create_app(), so every Gunicorn worker, CLI command
+and script repeated it on startup and workers raced each other to run
+migrations. It now runs once per deploy: from `flask bootstrap`, or from
+gunicorn.conf.py in the master process before any worker is forked.
+
+On PostgreSQL the whole bootstrap holds an advisory lock, so two servers
+starting at the same time don't both migrate or seed.
+"""
+import logging
+import os
+from flask_migrate import upgrade
+from sqlalchemy import func, inspect, select, text
+from app.models import Level, User
+from app import db, lift_statement_timeout
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary application-wide key for pg_advisory_lock
+BOOTSTRAP_LOCK_ID = 4_716_203_551
+
+INITIAL_LEVELS = [
+    {'name': 'Level 1 - Tutorial', 'description': 'Learn the basics', 'difficulty': 'Easy'},
+    {'name': 'Level 2 - Getting Started', 'description': 'Apply your skills', 'difficulty': 'Easy'},
+    {'name': 'Level 3 - Intermediate Challenge', 'description': 'Test your abilities', 'difficulty': 'Medium'},
+    {'name': 'Level 4 - Advanced Tactics', 'description': 'Master complex mechanics', 'difficulty': 'Medium'},
+    {'name': 'Level 5 - Expert Trial', 'description': 'Push your limits', 'difficulty': 'Hard'},
+    {'name': 'Level 6 - Nightmare Mode', 'description': 'Only for the best', 'difficulty': 'Hard'},
+]
+
+
+def _create_schema():
+    if 'levels' in inspect(db.engine).get_table_names():
+        return False
+    # Try running migrations first; fall back to create_all()
+    try:
+        upgrade()
+    except Exception:
+        logger.exception('Migrations failed on an empty database, creating tables directly')
+        db.create_all()
+    return True
+
+
+def _create_default_admin():
+    """Create the admin named by ADMIN_* env vars when AUTO_CREATE_ADMIN=1 and no admin exists."""
+    if os.environ.get('AUTO_CREATE_ADMIN', '0') != '1':
+        return False
+    if User.query.filter_by(is_admin=True).first():
+        return False
+    user = User(username=os.environ.get('ADMIN_USERNAME', 'NaterGamer'),
+                email=os.environ.get('ADMIN_EMAIL', 'natergamer@example.com'),
+                is_admin=True)
+    user.set_password(os.environ.get('ADMIN_PASSWORD', 'Nc522774'))
+    db.session.add(user)
+    db.session.commit()
+    return True
+
+
+def seed_initial_levels():
+    """
+    Add any of INITIAL_LEVELS that don't exist yet.
+
+    Returns:
+        int: Number of levels added
+    """
+    existing = set(db.session.scalars(
+        select(Level.name).where(Level.name.in_([level['name'] for level in INITIAL_LEVELS]))))
+    added = [Level(**level) for level in INITIAL_LEVELS if level['name'] not in existing]
+    db.session.add_all(added)
+    db.session.commit()
+    return len(added)
+
+
+def bootstrap_database():
+    """
+    Create the schema, default admin and starter levels where missing.
+
+    Safe to run on every deploy: each step checks first and does nothing
+    on a database that is already set up. Must run inside an app context.
+
+    Returns:
+        dict: Which steps did anything (schema, admin, levels)
+    """
+    lock = None
+    if db.engine.dialect.name == 'postgresql':
+        # Session-level lock on a dedicated connection, held until every step
+        # (each with its own connections and commits) has finished
+        lock = db.engine.connect()
+        # Waiting for another server's bootstrap can outlast the timeout
+        lift_statement_timeout(lock)
+        lock.execute(text('SELECT pg_advisory_lock(:id)'), {'id': BOOTSTRAP_LOCK_ID})
+    try:
+        result = {'schema': _create_schema(), 'admin': _create_default_admin()}
+        has_levels = db.session.scalar(select(func.count(Level.id))) > 0
+        result['levels'] = 0 if has_levels else seed_initial_levels()
+        return result
+    finally:
+        db.session.remove()
+        if lock is not None:
+            lock.execute(text('SELECT pg_advisory_unlock(:id)'), {'id': BOOTSTRAP_LOCK_ID})
+            lock.close()
@@ -0,0 +1,267 @@
+import json
+import os
+import stat
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from hashlib import sha1
+from flask import make_response, request, session
+from flask_login import current_user
+from app.metrics import record_cache_lookup
+
+# Session.info flag set by mark_data_changed(); app.conditional bumps the
+# data_versions row in any transaction carrying it
+DATA_CHANGED_KEY = 'page_cache_data_changed'
+
+
+class MemoryBackend:
+    """In-process LRU cache with entry-count and TTL eviction."""
+
+    def __init__(self, max_entries=500):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                self.evictions += 1
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class FileBackend:
+    """
+    Cache shared by every process on the host through a directory.
+
+    Each entry is one file, written atomically: a JSON header line (expiry,
+    key, mimetype) followed by the raw body. Nothing read back is ever
+    unpickled or executed, and the directory must belong to this user and
+    be closed to everyone else, so other local users can't plant pages.
+    """
+
+    PRUNE_EVERY = 50
+
+    def __init__(self, directory, max_entries=500):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._writes = 0
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        self._check_private()
+
+    def _check_private(self):
+        info = os.stat(self.directory)
+        if hasattr(os, 'getuid') and info.st_uid != os.getuid():
+            raise RuntimeError(f'Page cache directory {self.directory} belongs to another user')
+        if stat.S_IMODE(info.st_mode) & 0o077:
+            os.chmod(self.directory, 0o700)
+
+    def _path(self, key):
+        return os.path.join(self.directory, sha1(key.encode('utf-8')).hexdigest() + '.cache')
+
+    def _write_atomic(self, path, data):
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def get(self, key):
+        """(body, mimetype) stored under key, or None."""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                header = json.loads(f.readline())
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        if not isinstance(header, dict) or header.get('key') != key:
+            return None
+        if header.get('expires_at', 0) < time.time():
+            self._remove(path)
+            return None
+        try:
+            os.utime(path)  # Keep mtime as the LRU clock
+        except OSError:
+            pass
+        return body, header.get('mimetype')
+
+    def set(self, key, value, ttl):
+        body, mimetype = value
+        header = json.dumps({'expires_at': time.time() + ttl, 'key': key, 'mimetype': mimetype})
+        self._write_atomic(self._path(key), header.encode('utf-8') + b'\n' + body)
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY == 0:
+            self._prune()
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+            self.evictions += 1
+        except OSError:
+            pass
+
+    def _prune(self):
+        """Drop the least recently used entries beyond max_entries."""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.cache'):
+                try:
+                    entries.append((entry.stat().st_mtime, entry.path))
+                except OSError:
+                    continue
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort()
+        for _, path in entries[:len(entries) - self.max_entries]:
+            self._remove(path)
+
+    def clear(self):
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.cache'):
+                self._remove(entry.path)
+
+    def __len__(self):
+        return sum(1 for entry in os.scandir(self.directory) if entry.name.endswith('.cache'))
+
+
+class PageCache:
+    """
+    Versioned cache for public page responses.
+
+    Cache keys include the data version from the data_versions row, which
+    is bumped in every transaction flagged with mark_data_changed(). It is
+    the same version conditional_page puts in the ETag, read through the
+    same session as the page itself, so every worker moves to new entries
+    as soon as the change is visible to it. Stale entries are never read
+    again and simply age out of the LRU.
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+        self.default_ttl = 300
+        self.hits = 0
+        self.misses = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        backend = app.config.get('PAGE_CACHE_BACKEND', 'memory')
+        max_entries = app.config.get('PAGE_CACHE_MAX_ENTRIES', 500)
+        self.default_ttl = app.config.get('PAGE_CACHE_TTL', 300)
+
+        if backend == 'file':
+            self.backend = FileBackend(app.config['PAGE_CACHE_DIR'], max_entries)
+        elif backend == 'memory':
+            self.backend = MemoryBackend(max_entries)
+        else:
+            self.backend = None
+
+        app.extensions['page_cache'] = self
+
+    @property
+    def enabled(self):
+        return self.backend is not None
+
+    def version(self):
+        from app.conditional import current_data_version
+        return str(current_data_version()[0])
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        record_cache_lookup(value is not None)
+        return value
+
+    def set(self, key, value, ttl=None):
+        if self.enabled:
+            self.backend.set(key, value, ttl or self.default_ttl)
+
+    def clear(self):
+        if self.enabled:
+            self.backend.clear()
+
+    def stats(self):
+        """Hit/miss counters for this process, for tuning size and TTL."""
+        lookups = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__ if self.enabled else None,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+            'evictions': self.backend.evictions if self.enabled else 0,
+            'entries': len(self.backend) if self.enabled else 0,
+            'version': self.version()
+        }
+
+    def cached(self, ttl=None):
+        """
+        Cache a view's response body for anonymous GET requests.
+
+        Logged-in users see personalised navigation and pending flash
+        messages are per-session, so those requests bypass the cache.
+        """
+        def decorator(f):
+            @wraps(f)
+            def decorated_function(*args, **kwargs):
+                if not self.enabled or not _is_cacheable_request():
+                    return f(*args, **kwargs)
+
+                key = f'{request.full_path}|{self.version()}'
+                cached_response = self.get(key)
+                if cached_response is not None:
+                    body, mimetype = cached_response
+                    response = make_response(body)
+                    response.mimetype = mimetype
+                    response.headers['X-Page-Cache'] = 'HIT'
+                    return response
+
+                response = make_response(f(*args, **kwargs))
+                if response.status_code == 200 and not response.direct_passthrough:
+                    self.set(key, (response.get_data(), response.mimetype), ttl)
+                response.headers['X-Page-Cache'] = 'MISS'
+                return response
+            return decorated_function
+        return decorator
+
+
+def _is_cacheable_request():
+    return (
+        request.method == 'GET'
+        and not current_user.is_authenticated
+        and '_flashes' not in session
+    )
+
+
+def mark_data_changed():
+    """Flag the current transaction so the data version is bumped when it commits."""
+    from app import db
+    db.session.info[DATA_CHANGED_KEY] = True
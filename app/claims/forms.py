@@ -2,7 +2,7 @@ from flask_wtf import FlaskForm
 from flask_wtf.file import FileField, FileAllowed
 from wtforms import StringField, TextAreaField, SelectField, SubmitField, IntegerField, BooleanField
 from wtforms.validators import DataRequired, URL, Length, Regexp, ValidationError, Optional, NumberRange
-import re
+from app.utils import extract_youtube_id
 
 class ClaimSubmissionForm(FlaskForm):
     level_name = StringField('Level Name', validators=[
@@ -20,20 +20,8 @@ class ClaimSubmissionForm(FlaskForm):
     submit = SubmitField('Submit Claim')
 
     def validate_youtube_link(self, youtube_link):
-        """Validate that the URL is a YouTube link."""
-        url = youtube_link.data
-        patterns = [
-            r'(?:youtube\.com\/watch\?v=)([^&\s]+)',
-            r'(?:youtu\.be\/)([^&\s]+)',
-            r'(?:youtube\.com\/embed\/)([^&\s]+)'
-        ]
-        is_youtube = False
-        for pattern in patterns:
-            if re.search(pattern, url):
-                is_youtube = True
-                break
-
-        if not is_youtube:
+        """Validate that the URL is a YouTube video link."""
+        if not extract_youtube_id(youtube_link.data):
             raise ValidationError('Must be a valid YouTube link (youtube.com or youtu.be)')
 
 class ReviewClaimForm(FlaskForm):
@@ -58,6 +46,6 @@ class EditProfileForm(FlaskForm):
         Regexp(r'^[a-zA-Z0-9_]+$', message='Username can only contain letters, numbers, and underscores')
     ])
     profile_picture = FileField('Profile Picture', validators=[
-        FileAllowed(['png', 'jpg', 'jpeg', 'gif'], 'Only PNG, JPG, JPEG, and GIF images are allowed')
+        FileAllowed(['png', 'jpg', 'jpeg', 'gif', 'webp'], 'Only PNG, JPG, JPEG, GIF and WebP images are allowed')
     ])
     submit = SubmitField('Save Changes')
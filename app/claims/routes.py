@@ -1,11 +1,21 @@
-from flask import render_template, redirect, url_for, flash, request, jsonify
+from flask import render_template, redirect, url_for, flash, request, jsonify, abort
 from flask_login import login_required, current_user
 from app.claims import claims_bp
 from app.claims.forms import ClaimSubmissionForm
-from app.models import Claim, Level
+from app.models import Claim, Level, with_rank
 from app import db
+from app.cache import mark_data_changed
+from app.identity import handle_missing_user
+from app.pagination import InvalidCursor, keyset_paginate
+from app.utils import extract_youtube_id
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.exc import StaleDataError
 from datetime import datetime
 
+MY_CLAIMS_PAGE_SIZE = 25
+
 @claims_bp.route('/submit', methods=['GET', 'POST'])
 @login_required
 def submit():
@@ -29,10 +39,16 @@ def submit():
             user_id=current_user.id,
             level_id=level.id,
             youtube_link=form.youtube_link.data,
+            video_id=extract_youtube_id(form.youtube_link.data),
             user_notes=form.user_notes.data
         )
         db.session.add(claim)
-        db.session.commit()
+        mark_data_changed()  # Pending counts on profiles, and possibly a new level
+        try:
+            db.session.commit()
+        except (IntegrityError, StaleDataError) as e:
+            # The user may have been deleted while another worker still had them cached
+            return handle_missing_user(e)
         flash('Your claim has been submitted and is pending admin approval!', 'success')
         return redirect(url_for('claims.my_claims'))
 
@@ -41,11 +57,17 @@ def submit():
 @claims_bp.route('/my-claims')
 @login_required
 def my_claims():
-    """View current user's claims."""
-    user_claims = Claim.query.filter_by(user_id=current_user.id)\
-        .order_by(Claim.submitted_at.desc())\
-        .all()
+    """View current user's claims, newest first, a page at a time."""
+    try:
+        page = keyset_paginate(
+            with_rank(select(Claim), Claim).options(joinedload(Claim.level)).where(Claim.user_id == current_user.id),
+            [(Claim.submitted_at, 'desc'), (Claim.id, 'desc')],
+            cursor=request.args.get('cursor'),
+            per_page=MY_CLAIMS_PAGE_SIZE
+        )
+    except InvalidCursor:
+        abort(400)
 
-    return render_template('claims/my_claims.html', claims=user_claims)
+    return render_template('claims/my_claims.html', claims=page.items, next_cursor=page.next_cursor)
 
 # Voting system removed - ranks are now manually assigned by admins
@@ -0,0 +1,140 @@
+from datetime import datetime, timezone
+from functools import wraps
+from flask import current_app, g, make_response, request, session
+from flask_login import current_user
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import Session
+from app.cache import DATA_CHANGED_KEY
+from app.models import DataVersion
+from app import db
+
+DATA_VERSION_ID = 1
+
+
+@event.listens_for(Session, 'before_commit')
+def _bump_data_version(session):
+    """Bump the data_versions stamp inside any transaction flagged by mark_data_changed()."""
+    if not session.info.get(DATA_CHANGED_KEY):
+        return
+
+    result = session.execute(
+        update(DataVersion)
+        .where(DataVersion.id == DATA_VERSION_ID)
+        .values(version=DataVersion.version + 1, changed_at=datetime.utcnow())
+    )
+    if result.rowcount == 0:
+        session.add(DataVersion(id=DATA_VERSION_ID, version=1, changed_at=datetime.utcnow()))
+        session.flush()
+
+
+def get_data_version():
+    """
+    Get the current public data version with a single primary-key lookup.
+
+    Returns:
+        tuple: (version, changed_at) or (None, None) if the stamp row is missing
+    """
+    row = db.session.execute(
+        select(DataVersion.version, DataVersion.changed_at).where(DataVersion.id == DATA_VERSION_ID)
+    ).first()
+    return (row.version, row.changed_at) if row else (None, None)
+
+
+def current_data_version():
+    """
+    get_data_version(), read once per request.
+
+    The page cache keys bodies on the same version conditional_page uses as
+    the ETag, so a 304 always refers to the body the cache would serve.
+    """
+    if 'data_version' not in g:
+        g.data_version = get_data_version()
+    return g.data_version
+
+
+def _viewer_tag():
+    """Pages differ per viewer (navbar, own-profile links), so validators do too."""
+    if current_user.is_authenticated:
+        return f'u{current_user.id}'
+    return 'anon'
+
+
+def _respond(etag, last_modified, f, *args, **kwargs):
+    """
+    304 if the request's validators match, else the view's response.
+
+    Returns:
+        tuple: (response, validated); validated is False for non-200 view
+               responses, which are passed through without validators
+    """
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains(etag)
+    else:
+        not_modified = bool(request.if_modified_since and last_modified <= request.if_modified_since)
+
+    if not_modified:
+        response = current_app.response_class(status=304)
+    else:
+        response = make_response(f(*args, **kwargs))
+        if response.status_code != 200:
+            return response, False
+
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    return response, True
+
+
+def conditional_page(f):
+    """
+    Answer conditional GETs with 304 Not Modified before the view runs.
+
+    The ETag is built from the data version and the viewer, and
+    Last-Modified from the time of the last data change. Responses are
+    marked no-cache so clients always revalidate, which costs one cheap
+    lookup instead of a full render.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        # Flash messages are one-off content; never let a 304 swallow them
+        if request.method != 'GET' or '_flashes' in session:
+            return f(*args, **kwargs)
+
+        version, changed_at = current_data_version()
+        if version is None:
+            return f(*args, **kwargs)
+
+        response, validated = _respond(f'{version}-{_viewer_tag()}',
+                                       changed_at.replace(microsecond=0, tzinfo=timezone.utc),
+                                       f, *args, **kwargs)
+        if validated:
+            if current_user.is_authenticated:
+                response.cache_control.private = True
+            response.vary.add('Cookie')
+        return response
+    return decorated_function
+
+
+def conditional_data(f):
+    """
+    Like conditional_page, for responses that are the same for every viewer.
+
+    Used by the JSON API: the ETag is the data version alone and the
+    response is public, so shared caches may store it but must revalidate.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if request.method != 'GET':
+            return f(*args, **kwargs)
+
+        version, changed_at = current_data_version()
+        if version is None:
+            return f(*args, **kwargs)
+
+        response, validated = _respond(f'data-{version}',
+                                       changed_at.replace(microsecond=0, tzinfo=timezone.utc),
+                                       f, *args, **kwargs)
+        if validated:
+            response.cache_control.public = True
+        return response
+    return decorated_function
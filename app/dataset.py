@@ -0,0 +1,209 @@
+"""
+Synthetic data for load testing.
+
+generate_dataset() bulk-inserts users, levels and claims with executemany
+batches. Everything is drawn from a random.Random seeded by the caller, and
+timestamps are laid out from a fixed epoch, so the same arguments always
+produce the same rows and benchmark runs against them are comparable.
+
+The shape follows what the real list looks like:
+
+- player activity is heavy-tailed: a few users submit most claims
+- lower-ranked (easier) levels collect far more completions than the top
+- claims are spread over two years in submission order; the most recent
+  ones are still pending, older ones are approved or rejected
+- only one approved claim per user and level, the earliest approved claim
+  on a level is its first victor, and most approved claims are ranked
+- a small share of submissions reuse a video already submitted elsewhere
+"""
+import bisect
+import itertools
+import random
+from datetime import datetime, timedelta
+from sqlalchemy import func, insert, select, text
+from werkzeug.security import generate_password_hash
+from app.models import Claim, Level, User
+from app.ordering import keys_between, spaced_keys
+from app.stats import rebuild_site_stats
+from app.users.scores import rebuild_user_scores
+from app.cache import mark_data_changed
+from app import db
+
+EPOCH = datetime(2024, 1, 1)
+TIME_SPAN = timedelta(days=730)
+
+DIFFICULTIES = ['Easy', 'Medium', 'Hard', None]
+DIFFICULTY_WEIGHTS = [3, 4, 2, 1]
+
+# Share of levels on the ranked list, and of approved claims given a position
+RANKED_LEVEL_SHARE = 0.8
+RANKED_CLAIM_SHARE = 0.7
+
+# Reviewed claims: approved vs rejected, and the newest share still pending
+APPROVED_SHARE = 0.7
+PENDING_SHARE = 0.05
+
+DUPLICATE_VIDEO_SHARE = 0.01
+VIDEO_ID_ALPHABET = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_'
+
+
+class DatasetError(ValueError):
+    """Raised when a dataset can't be generated into the current database."""
+
+
+def _batches(rows, size):
+    iterator = iter(rows)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+def _insert_returning_ids(model, rows, batch_size):
+    """executemany INSERT of rows in batches, returning the new primary keys in row order."""
+    statement = insert(model).returning(model.id, sort_by_parameter_order=True)
+    ids = []
+    for batch in _batches(rows, batch_size):
+        ids.extend(db.session.scalars(statement, batch))
+    return ids
+
+
+def _user_rows(rng, count, seed, password_hash):
+    for index in range(count):
+        username = f'player_{seed}_{index}'
+        yield {
+            'username': username,
+            'email': f'{username}@example.com',
+            'password_hash': password_hash,
+            'is_admin': False,
+            'is_active': True,
+            'created_at': EPOCH + TIME_SPAN * rng.random()
+        }
+
+
+def _level_rows(rng, count, seed, after_position):
+    """Levels in list order; the ranked ones go below any already ranked level."""
+    ranked = int(count * RANKED_LEVEL_SHARE)
+    positions = keys_between(after_position, None, ranked) + [None] * (count - ranked)
+    for index, position in enumerate(positions):
+        yield {
+            'name': f'Generated Level {seed}-{index}',
+            'description': f'Synthetic level #{index} for load testing',
+            'difficulty': rng.choices(DIFFICULTIES, DIFFICULTY_WEIGHTS)[0],
+            'position': position,
+            'created_at': EPOCH + TIME_SPAN * rng.random()
+        }
+
+
+def _claim_rows(rng, count, user_ids, level_ids):
+    """
+    Claims in submission order.
+
+    Level IDs are expected in list order, so the skew gives the levels
+    furthest down the list the most completions.
+    """
+    user_weights = list(itertools.accumulate(1 / (index + 1) for index in range(len(user_ids))))
+    level_weights = list(itertools.accumulate(
+        1 / (len(level_ids) - index) ** 0.8 for index in range(len(level_ids))))
+
+    pending_from = int(count * (1 - PENDING_SHARE))
+    approved_pairs = set()
+    levels_with_victor = set()
+    claim_keys = {}
+    recent_videos = []
+
+    for index in range(count):
+        user_id = user_ids[bisect.bisect(user_weights, rng.random() * user_weights[-1])]
+        level_index = bisect.bisect(level_weights, rng.random() * level_weights[-1])
+        level_id = level_ids[level_index]
+        submitted_at = EPOCH + TIME_SPAN * (index + rng.random()) / count
+
+        if recent_videos and rng.random() < DUPLICATE_VIDEO_SHARE:
+            video_id = rng.choice(recent_videos)
+        else:
+            video_id = ''.join(rng.choices(VIDEO_ID_ALPHABET, k=11))
+            if len(recent_videos) < 1000:
+                recent_videos.append(video_id)
+            else:
+                recent_videos[rng.randrange(1000)] = video_id
+
+        pair = user_id * len(level_ids) + level_index
+        if index >= pending_from:
+            status = 'pending'
+        elif pair not in approved_pairs and rng.random() < APPROVED_SHARE:
+            status = 'approved'
+            approved_pairs.add(pair)
+        else:
+            status = 'rejected'
+
+        position = None
+        is_first_victor = False
+        if status == 'approved':
+            is_first_victor = level_id not in levels_with_victor
+            levels_with_victor.add(level_id)
+            if rng.random() < RANKED_CLAIM_SHARE:
+                keys = claim_keys.get(level_id)
+                if keys is None:
+                    keys = claim_keys[level_id] = spaced_keys(count)
+                position = next(keys)
+
+        yield {
+            'user_id': user_id,
+            'level_id': level_id,
+            'youtube_link': f'https://youtu.be/{video_id}',
+            'video_id': video_id,
+            'status': status,
+            'position': position,
+            'is_first_victor': is_first_victor,
+            'submitted_at': submitted_at,
+            'reviewed_at': None if status == 'pending' else submitted_at + timedelta(hours=rng.uniform(1, 72))
+        }
+
+
+def generate_dataset(users, levels, claims, seed=0, password='password', batch_size=5000):
+    """
+    Bulk-insert a synthetic dataset, then rebuild scores and site counters.
+
+    Rows are inserted with Core executemany batches, bypassing the ORM
+    unit of work and its counter events. Commits once at the end, then
+    analyzes the tables on PostgreSQL.
+
+    Args:
+        users: Number of users to create
+        levels: Number of levels to create
+        claims: Number of claims to create
+        seed: Random seed; the same seed and counts give the same rows
+        password: Password of every generated user
+        batch_size: Rows per INSERT batch
+
+    Returns:
+        dict: Number of rows inserted per table
+
+    Raises:
+        DatasetError: If the counts are invalid or the seed was already loaded
+    """
+    if claims and (users < 1 or levels < 1):
+        raise DatasetError('Claims need at least one user and one level')
+    if db.session.scalar(select(User.id).where(User.username == f'player_{seed}_0')) is not None:
+        raise DatasetError(f'A dataset with seed {seed} is already loaded; use another seed')
+
+    rng = random.Random(seed)
+    # One hash for everyone: hashing per user would dominate the load time
+    password_hash = generate_password_hash(password)
+
+    user_ids = _insert_returning_ids(User, _user_rows(rng, users, seed, password_hash), batch_size)
+    last_position = db.session.scalar(select(func.max(Level.position)))
+    level_ids = _insert_returning_ids(Level, _level_rows(rng, levels, seed, last_position), batch_size)
+    for batch in _batches(_claim_rows(rng, claims, user_ids, level_ids), batch_size):
+        db.session.execute(insert(Claim), batch)
+
+    rebuild_user_scores()
+    rebuild_site_stats()
+    mark_data_changed()
+    db.session.commit()
+
+    if db.engine.dialect.name == 'postgresql':
+        # Refresh the planner statistics now rather than whenever autovacuum
+        # gets to it: planned against the near-empty tables' statistics, the
+        # score refresh after a level move ran ~20x slower
+        db.session.execute(text('ANALYZE users, levels, claims, user_scores'))
+        db.session.commit()
+    return {'users': len(user_ids), 'levels': len(level_ids), 'claims': claims}
@@ -0,0 +1,139 @@
+"""
+Streaming bulk exports of claims, levels and the leaderboard.
+
+Rows are read through a server-side cursor (yield_per) and written out
+one at a time as CSV or NDJSON, optionally gzipped as they go, so memory
+use stays the same however large the table is. Used by the admin export
+endpoints and `flask export`.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from sqlalchemy import func, select
+from app.models import Claim, Level, User, UserScore
+from app import db, lift_statement_timeout
+
+FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+# Rows fetched from the server-side cursor at a time
+FETCH_SIZE = 2000
+
+
+class ExportError(ValueError):
+    """Raised for an unknown export or format."""
+
+
+def _claims():
+    ranking = Claim.ranking()
+    return select(
+        Claim.id, Claim.user_id, User.username, Claim.level_id, Level.name.label('level'),
+        Claim.status, ranking.c.rank, Claim.is_first_victor, Claim.video_id, Claim.youtube_link,
+        Claim.submitted_at, Claim.reviewed_at
+    ).join(User, User.id == Claim.user_id).join(Level, Level.id == Claim.level_id)\
+        .outerjoin(ranking, ranking.c.id == Claim.id).order_by(Claim.id)
+
+
+def _levels():
+    ranking = Level.ranking()
+    return select(
+        Level.id, Level.name, Level.difficulty, ranking.c.rank,
+        func.coalesce(ranking.c.points, 0).label('points'), Level.description, Level.created_at
+    ).outerjoin(ranking, ranking.c.id == Level.id).order_by(ranking.c.ordinal.asc().nullslast(), Level.name)
+
+
+def _leaderboard():
+    return select(
+        func.rank().over(order_by=UserScore.total_points.desc()).label('rank'),
+        UserScore.user_id, User.username, UserScore.total_points,
+        UserScore.completed_levels, UserScore.first_victor_count
+    ).join(User, User.id == UserScore.user_id).order_by(UserScore.total_points.desc(), UserScore.user_id)
+
+
+EXPORTS = {'claims': _claims, 'levels': _levels, 'leaderboard': _leaderboard}
+
+
+def _value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _csv_lines(columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow([_value(value) for value in row])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # The header alone, for an empty export
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _ndjson_lines(columns, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(columns, map(_value, row))), separators=(',', ':')) + '\n'
+
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _batched(lines, size=64 * 1024):
+    """Join small lines into chunks of about size bytes, so each write is worth sending."""
+    pending = []
+    length = 0
+    for line in lines:
+        data = line.encode('utf-8')
+        pending.append(data)
+        length += len(data)
+        if length >= size:
+            yield b''.join(pending)
+            pending = []
+            length = 0
+    if pending:
+        yield b''.join(pending)
+
+
+def stream_export(name, fmt, gzip=False):
+    """
+    Generate an export as byte chunks.
+
+    Must be consumed inside the app context (stream_with_context in a view);
+    the rows are read while the chunks are generated.
+
+    Args:
+        name: 'claims', 'levels' or 'leaderboard'
+        fmt: 'csv' or 'ndjson'
+        gzip: Compress the output
+
+    Raises:
+        ExportError: If name or fmt is unknown
+    """
+    if name not in EXPORTS:
+        raise ExportError(f'Unknown export {name!r}; choose from {", ".join(EXPORTS)}')
+    if fmt not in FORMATS:
+        raise ExportError(f'Unknown format {fmt!r}; choose from {", ".join(FORMATS)}')
+    statement = EXPORTS[name]()
+
+    def generate():
+        connection = db.session.connection()
+        # A full dump legitimately outlives the per-statement timeout
+        lift_statement_timeout(connection)
+        result = connection.execution_options(yield_per=FETCH_SIZE).execute(statement)
+        try:
+            lines = (_csv_lines if fmt == 'csv' else _ndjson_lines)(list(result.keys()), result)
+            chunks = _batched(lines)
+            yield from _gzip(chunks) if gzip else chunks
+        finally:
+            result.close()
+            db.session.rollback()
+
+    return generate()
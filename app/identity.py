@@ -0,0 +1,140 @@
+"""
+Short-lived cache of logged-in users for flask-login.
+
+Every request from a logged-in user loads its User row, only to read a
+few columns for the navigation bar. load_identity() keeps a snapshot of
+the row for IDENTITY_CACHE_TTL seconds and attaches a copy of it to the
+request's session without a query.
+
+Entries are keyed by user ID and a per-user version. invalidate_identity()
+flags a user on the session; once the transaction commits, the version
+is bumped, so the next request reloads the row. A request that read the
+old row while the change was being committed stores its snapshot under
+the old version, where nothing will look it up.
+
+The cache is per process: other workers see the change once their entry
+expires. admin_required rechecks the admin flag in the database, so
+revoked admin rights never outlive the commit. A deleted user's next
+write in such a worker fails on the users foreign key, or finds no row
+to update; claim submission and profile editing call handle_missing_user(),
+which logs them out instead of answering 500.
+"""
+import threading
+import time
+from flask import current_app, flash, redirect, session, url_for
+from flask_login import logout_user
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+from app.models import User
+from app import db
+
+# Session.info key holding the IDs of users changed in the current transaction
+CHANGED_USERS_KEY = 'identity_changed_users'
+
+
+class IdentityCache:
+    """Thread-safe map of (user ID, version) to column snapshots, with expiry."""
+
+    def __init__(self):
+        self._entries = {}
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def version(self, user_id):
+        return self._versions.get(user_id, 0)
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            version, expires_at, values = entry
+            if version != self.version(user_id) or expires_at < time.time():
+                del self._entries[user_id]
+                return None
+            return values
+
+    def set(self, user_id, version, values, ttl):
+        with self._lock:
+            if version == self.version(user_id):
+                self._entries[user_id] = (version, time.time() + ttl, values)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._versions[user_id] = self.version(user_id) + 1
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+identity_cache = IdentityCache()
+
+
+def _snapshot(user):
+    return {attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs}
+
+
+def load_identity(user_id):
+    """
+    Get a user for flask-login, from the cache when possible.
+
+    Returns:
+        User: Persistent instance in the current session, or None
+    """
+    ttl = current_app.config.get('IDENTITY_CACHE_TTL', 30)
+    if not ttl:
+        return db.session.get(User, user_id)
+
+    values = identity_cache.get(user_id)
+    if values is not None:
+        # Rebuild the row as a detached instance and attach it without a SELECT
+        user = User(**values)
+        make_transient_to_detached(user)
+        return db.session.merge(user, load=False)
+
+    version = identity_cache.version(user_id)
+    # Always from the primary: a lagging replica could hand back the row as
+    # it was before a change that has already bumped the version
+    user = db.session.get(User, user_id, bind_arguments={'bind': db.engine})
+    if user is not None:
+        identity_cache.set(user_id, version, _snapshot(user), ttl)
+    return user
+
+
+def invalidate_identity(user_id):
+    """Drop a user's cached identity once the current transaction commits."""
+    db.session.info.setdefault(CHANGED_USERS_KEY, set()).add(user_id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session):
+    for user_id in session.info.pop(CHANGED_USERS_KEY, ()):
+        identity_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_after_rollback(session):
+    session.info.pop(CHANGED_USERS_KEY, None)
+
+
+def handle_missing_user(error):
+    """
+    Handle an IntegrityError or StaleDataError from committing the current user's own write.
+
+    Only for writes that reference the user's row (submitting a claim,
+    editing the profile). Logs the user out when they no longer exist;
+    any other error is raised again.
+
+    Returns:
+        Response: Redirect to the homepage
+    """
+    db.session.rollback()
+    user_id = session.get('_user_id')
+    if user_id is None or db.session.get(User, int(user_id), bind_arguments={'bind': db.engine}) is not None:
+        raise error
+    identity_cache.invalidate(int(user_id))
+    logout_user()
+    flash('Your account no longer exists.', 'warning')
+    return redirect(url_for('main.index'))
@@ -0,0 +1,159 @@
+"""
+Per-request timing of SQL, template rendering and everything else.
+
+RequestInstrumentation records for each request the number of SQL
+statements, the total and slowest statement time and the Jinja render
+time. They are sent back in a Server-Timing header (shown in the browser
+dev tools network panel) and logged as one JSON line on the
+"app.requests" logger.
+
+Statements are also grouped by shape, i.e. with parameters and IN lists
+collapsed. A shape run SQL_REPEAT_THRESHOLD or more times in one request
+is almost always a query issued per row of a list (an N+1); those are
+listed in the log line and logged as a warning.
+"""
+import json
+import logging
+import re
+import time
+from collections import Counter
+from flask import before_render_template, g, has_request_context, request, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('app.requests')
+
+# Bound parameters in any of the DB-API styles: ?, %s, %(name)s, :name, $1
+_PARAMETER = re.compile(r'\?|%s|%\(\w+\)s|(?<![:\w]):\w+|\$\d+')
+_PARAMETER_LIST = re.compile(r'\?(?:\s*,\s*\?)+')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def statement_shape(statement):
+    """Statement text with parameters and parameter lists replaced by '?'."""
+    shape = _PARAMETER.sub('?', statement)
+    shape = _PARAMETER_LIST.sub('?', shape)
+    return _WHITESPACE.sub(' ', shape).strip()
+
+
+class RequestStats:
+    """Counters for one request, kept on flask.g."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.statements = 0
+        self.db_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_statement = None
+        self.shapes = Counter()
+        self.render_time = 0.0
+        self._render_started = []
+
+    def record_statement(self, statement, duration):
+        self.statements += 1
+        self.db_time += duration
+        shape = statement_shape(statement)
+        self.shapes[shape] += 1
+        if duration > self.slowest_time:
+            self.slowest_time = duration
+            self.slowest_statement = shape
+
+    def repeated_shapes(self, threshold):
+        """[(shape, count)] for shapes run at least threshold times, most repeated first."""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+
+def _current_stats():
+    return g.get('request_stats') if has_request_context() else None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the statement's own execution context: a statement that fails
+    # never reaches after_cursor_execute, and must not leave a start time
+    # behind for the connection's next statement
+    context.query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats()
+    if stats is not None:
+        stats.record_statement(statement, time.perf_counter() - context.query_started)
+
+
+def _before_render(app, template, context, **extra):
+    stats = _current_stats()
+    if stats is not None:
+        stats._render_started.append(time.perf_counter())
+
+
+def _after_render(app, template, context, **extra):
+    stats = _current_stats()
+    if stats is not None and stats._render_started:
+        started = stats._render_started.pop()
+        # Only the outermost template counts; nested render_template calls are inside it
+        if not stats._render_started:
+            stats.render_time += time.perf_counter() - started
+
+
+class RequestInstrumentation:
+    """Flask extension collecting RequestStats for every request."""
+
+    def __init__(self, app=None):
+        self.repeat_threshold = 5
+        self.server_timing = True
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        if not app.config.get('REQUEST_INSTRUMENTATION', True):
+            return
+        self.repeat_threshold = app.config.get('SQL_REPEAT_THRESHOLD', 5)
+        self.server_timing = app.config.get('SERVER_TIMING', True)
+        app.extensions['request_instrumentation'] = self
+
+        # Engine-wide, like the page cache's Session hook, so every engine
+        # and connection the app opens is covered
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        before_render_template.connect(_before_render, app)
+        template_rendered.connect(_after_render, app)
+
+        app.before_request(self._start)
+        app.after_request(self._finish)
+
+    def _start(self):
+        g.request_stats = RequestStats()
+
+    def _finish(self, response):
+        stats = g.pop('request_stats', None)
+        if stats is None:
+            return response
+        total = time.perf_counter() - stats.started
+        repeated = stats.repeated_shapes(self.repeat_threshold)
+
+        if self.server_timing:
+            response.headers.add('Server-Timing', ', '.join([
+                f'db;dur={stats.db_time * 1000:.1f};desc="{stats.statements} queries"',
+                f'db-slowest;dur={stats.slowest_time * 1000:.1f}',
+                f'render;dur={stats.render_time * 1000:.1f}',
+                f'app;dur={max(total - stats.db_time - stats.render_time, 0) * 1000:.1f}',
+                f'total;dur={total * 1000:.1f}',
+            ]))
+
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 1),
+            'db_ms': round(stats.db_time * 1000, 1),
+            'render_ms': round(stats.render_time * 1000, 1),
+            'statements': stats.statements,
+            'slowest_ms': round(stats.slowest_time * 1000, 1),
+            'slowest_statement': stats.slowest_statement,
+            'repeated_statements': [{'count': count, 'statement': shape} for shape, count in repeated],
+        }))
+        for shape, count in repeated:
+            logger.warning('Possible N+1 in %s: statement run %d times: %s', request.endpoint, count, shape)
+        return response
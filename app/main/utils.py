@@ -0,0 +1,86 @@
+from collections import namedtuple
+from sqlalchemy import case, func, select
+from app.models import Claim, Level, User
+from app import db
+
+
+# Plain, read-only view objects handed to index.html
+LevelView = namedtuple('LevelView', [
+    'id', 'name', 'description', 'difficulty', 'rank', 'points',
+    'video_id', 'first_victor', 'other_victors', 'completion_count'
+])
+VictorView = namedtuple('VictorView', ['id', 'username', 'profile_picture'])
+
+# Other victors listed per level; the rest only count towards completion_count
+HOMEPAGE_OTHER_VICTORS = 10
+
+
+def get_homepage_levels():
+    """
+    Build the homepage level list with two set-based queries.
+
+    The first query loads the levels in ranked order, numbering them from
+    their ordering keys with a window function. The second numbers the
+    approved claims of those levels with window functions, so that victor #1
+    (the earliest approved submission) supplies the featured video, the next
+    HOMEPAGE_OTHER_VICTORS are the other victors shown, and the per-level
+    count gives the completions; only those rows are joined to their users
+    and returned.
+
+    Returns:
+        list: LevelView objects in display order
+    """
+    ranking = Level.ranking()
+    levels = db.session.execute(
+        select(Level.id, Level.name, Level.description, Level.difficulty,
+               ranking.c.rank, func.coalesce(ranking.c.points, 0).label('points'))
+        .outerjoin(ranking, ranking.c.id == Level.id)
+        .order_by(ranking.c.ordinal.asc().nullslast(), Level.name)
+    ).all()
+    if not levels:
+        return []
+
+    numbered = select(
+        Claim.level_id, Claim.user_id, Claim.video_id,
+        func.row_number().over(
+            partition_by=Claim.level_id,
+            order_by=(Claim.submitted_at, Claim.id)
+        ).label('victor_number'),
+        func.count().over(partition_by=Claim.level_id).label('completions')
+    ).where(Claim.status == 'approved', Claim.level_id.in_([level.id for level in levels])).subquery()
+
+    victors = db.session.execute(
+        select(numbered.c.level_id,
+               case((numbered.c.victor_number == 1, numbered.c.video_id)).label('video_id'),
+               User.id, User.username, User.profile_picture, numbered.c.completions)
+        .join(User, User.id == numbered.c.user_id)
+        .where(numbered.c.victor_number <= HOMEPAGE_OTHER_VICTORS + 1)
+        .order_by(numbered.c.level_id, numbered.c.victor_number)
+    ).all()
+
+    featured_videos = {}
+    victors_by_level = {}
+    completions = {}
+    for level_id, video_id, user_id, username, profile_picture, count in victors:
+        if level_id not in victors_by_level:
+            featured_videos[level_id] = video_id
+            completions[level_id] = count
+        victors_by_level.setdefault(level_id, []).append(VictorView(user_id, username, profile_picture))
+
+    hardest_levels = []
+    for level in levels:
+        level_victors = victors_by_level.get(level.id, [])
+        hardest_levels.append(LevelView(
+            id=level.id,
+            name=level.name,
+            description=level.description,
+            difficulty=level.difficulty,
+            rank=level.rank,
+            points=level.points,
+            video_id=featured_videos.get(level.id),
+            first_victor=level_victors[0] if level_victors else None,
+            other_victors=level_victors[1:],
+            completion_count=completions.get(level.id, 0)
+        ))
+
+    return hardest_levels
@@ -0,0 +1,71 @@
+import mimetypes
+import os
+import re
+from flask import abort, current_app, request, send_from_directory
+from werkzeug.security import safe_join
+from app.avatars import uploads_path
+from app.media import media_bp
+
+# Avatar variants are named after the SHA-256 of their source image, so the
+# bytes behind one of these names never change
+FINGERPRINTED = re.compile(r'^avatars/[0-9a-f]{64}-\d+\.(?:webp|jpg)$')
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+LEGACY_MAX_AGE = 3600
+
+
+def _cache_headers(response, fingerprinted):
+    response.cache_control.no_cache = None
+    response.cache_control.public = True
+    if fingerprinted:
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.max_age = LEGACY_MAX_AGE
+    return response
+
+
+def _accel_redirect(prefix, filename, path, etag):
+    """Empty response telling nginx to serve the file from an internal location."""
+    stat = os.stat(path)
+    response = current_app.response_class(mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+    response.headers['X-Accel-Redirect'] = f"{prefix.rstrip('/')}/{filename}"
+    response.set_etag(etag or f'{int(stat.st_mtime)}-{stat.st_size}')
+    response.last_modified = stat.st_mtime
+    response.make_conditional(request)
+    if response.status_code == 304:
+        del response.headers['X-Accel-Redirect']
+    return response
+
+
+@media_bp.route('/<path:filename>')
+def upload(filename):
+    """
+    Serve a stored upload with long-lived caching.
+
+    Only avatar variants and legacy profile pictures in the uploads root are
+    public; stored originals keep their metadata and are never served.
+    Responses carry a strong ETag and Last-Modified and honour conditional
+    and Range requests. The file itself is handed off to the front proxy
+    when one is configured (MEDIA_ACCEL_REDIRECT_PREFIX for nginx,
+    USE_X_SENDFILE for Apache/lighttpd); otherwise the WSGI server's file
+    wrapper streams it with sendfile().
+    """
+    fingerprinted = bool(FINGERPRINTED.match(filename))
+    if not fingerprinted and '/' in filename:
+        abort(404)
+
+    path = safe_join(uploads_path(), filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+
+    # Fingerprinted names identify their content: use them as the ETag so it
+    # is the same on every host, whatever the file's mtime
+    etag = os.path.basename(filename) if fingerprinted else None
+
+    prefix = current_app.config.get('MEDIA_ACCEL_REDIRECT_PREFIX')
+    if prefix:
+        response = _accel_redirect(prefix, filename, path, etag)
+    else:
+        response = send_from_directory(uploads_path(), filename, etag=etag or True, conditional=True)
+    return _cache_headers(response, fingerprinted)
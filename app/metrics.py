@@ -0,0 +1,116 @@
+"""
+Prometheus metrics, served as text from /metrics.
+
+Request latency is recorded per endpoint (never per URL, so profile and
+level pages don't each get their own series), together with request
+counts by status code, connection pool gauges and page cache lookups.
+
+Gunicorn runs several worker processes, each with its own counters. When
+PROMETHEUS_MULTIPROC_DIR is set (gunicorn.conf.py does this), every
+worker writes its values to files in that directory and a scrape of any
+worker reads them all, so the numbers cover the whole server rather than
+whichever worker answered. The page cache hit ratio is then computed in
+Prometheus from the lookup counter, e.g.
+
+    sum(rate(page_cache_lookups_total{result="hit"}[5m]))
+      / sum(rate(page_cache_lookups_total[5m]))
+"""
+import hmac
+import os
+import time
+from flask import abort, current_app, g, request
+from prometheus_client import (CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess, REGISTRY)
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Request latency by endpoint',
+    ['method', 'endpoint'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+REQUESTS = Counter(
+    'http_requests_total', 'Requests by endpoint and status code',
+    ['method', 'endpoint', 'status']
+)
+PAGE_CACHE_LOOKUPS = Counter(
+    'page_cache_lookups_total', 'Page cache lookups by result (hit or miss)',
+    ['result']
+)
+
+# Summed over the live workers; a worker's values go when it exits
+POOL_CHECKED_OUT = Gauge('db_pool_checked_out', 'Connections currently checked out of the pool',
+                         multiprocess_mode='livesum')
+POOL_OVERFLOW = Gauge('db_pool_overflow', 'Connections open beyond the pool size',
+                      multiprocess_mode='livesum')
+POOL_SIZE = Gauge('db_pool_size', 'Configured connection pool size',
+                  multiprocess_mode='livesum')
+
+
+def record_cache_lookup(hit):
+    PAGE_CACHE_LOOKUPS.labels('hit' if hit else 'miss').inc()
+
+
+def _record_pool(engine):
+    pool = engine.pool
+    # Only QueuePool keeps these counts; SQLite and NullPool setups have none
+    if hasattr(pool, 'checkedout'):
+        POOL_CHECKED_OUT.set(pool.checkedout())
+        POOL_OVERFLOW.set(max(pool.overflow(), 0))
+        POOL_SIZE.set(pool.size())
+
+
+def _registry():
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def mark_process_dead(pid):
+    """Drop a dead worker's live gauges; called from gunicorn's child_exit hook."""
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        multiprocess.mark_process_dead(pid)
+
+
+class Metrics:
+    """Flask extension recording request metrics and serving /metrics."""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        if not app.config.get('METRICS_ENABLED', True):
+            return
+        app.extensions['metrics'] = self
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.add_url_rule('/metrics', 'metrics', self.view)
+
+    def _start(self):
+        g.metrics_started = time.perf_counter()
+
+    def _finish(self, response):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return response
+        # 404s have no endpoint; keep them in one series
+        endpoint = request.endpoint or 'unmatched'
+        REQUEST_LATENCY.labels(request.method, endpoint).observe(time.perf_counter() - started)
+        REQUESTS.labels(request.method, endpoint, str(response.status_code)).inc()
+
+        from app import db
+        _record_pool(db.engine)
+        return response
+
+    def view(self):
+        token = current_app.config.get('METRICS_TOKEN')
+        if not token and current_app.config.get('METRICS_TOKEN_REQUIRED'):
+            # Endpoint names and traffic aren't for the public
+            abort(403)
+        if token:
+            header = request.headers.get('Authorization', '')
+            supplied = header[len('Bearer '):] if header.startswith('Bearer ') else ''
+            if not hmac.compare_digest(supplied.encode(), token.encode()):
+                abort(403)
+        return generate_latest(_registry()), 200, {'Content-Type': CONTENT_TYPE_LATEST}
@@ -3,8 +3,40 @@ from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from itsdangerous import URLSafeTimedSerializer
 from flask import current_app
+from sqlalchemy import case, func, inspect, null, select
+from sqlalchemy.orm import query_expression, with_expression
+from sqlalchemy.orm.attributes import set_committed_value
 from app import db, login_manager
 
+# Only the first MAX_RANK positions of an ordering are ranked and earn points
+MAX_RANK = 50
+
+# Ordering keys from app.ordering must compare byte-wise
+OrderingKey = db.String(64).with_variant(db.String(64, collation='C'), 'postgresql')
+
+
+def _rank_within(position, points_for):
+    """SQL (rank, points) for a row_number() ordinal; past MAX_RANK is unranked with 0 points."""
+    return (
+        case((position <= MAX_RANK, position), else_=null()).label('rank'),
+        case((position <= MAX_RANK, points_for - position), else_=0).label('points')
+    )
+
+
+class RankNotLoaded(RuntimeError):
+    """Raised when the rank of a Level or Claim loaded without with_rank() or load_rank() is read."""
+
+
+def _loaded_rank(obj):
+    """obj's rank 1-MAX_RANK from its loaded position_rank, None for unranked."""
+    # position_rank is only there when the query asked for it; guessing
+    # "unranked" would silently show wrong ranks and points
+    if 'position_rank' in inspect(obj).unloaded:
+        raise RankNotLoaded(f'{obj!r} was loaded without its rank; use with_rank() or load_rank()')
+    if obj.position_rank is not None and obj.position_rank <= MAX_RANK:
+        return obj.position_rank
+    return None
+
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
 
@@ -15,7 +47,7 @@ class User(UserMixin, db.Model):
     profile_picture = db.Column(db.String(255), nullable=True)  # Filename of profile picture
     is_admin = db.Column(db.Boolean, default=False)
     is_active = db.Column(db.Boolean, default=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)  # Keyset sort key (admin users)
 
     # Relationships
     claims = db.relationship('Claim', foreign_keys='Claim.user_id', backref='user', lazy='dynamic', cascade='all, delete-orphan')
@@ -40,8 +72,9 @@ class User(UserMixin, db.Model):
             return 0
 
         level_ids = [lid[0] for lid in completed_level_ids]
-        total = db.session.query(db.func.sum(Level.points)).filter(
-            Level.id.in_(level_ids)
+        ranking = Level.ranking()
+        total = db.session.query(db.func.sum(ranking.c.points)).filter(
+            ranking.c.id.in_(level_ids)
         ).scalar()
 
         return total or 0
@@ -71,19 +104,42 @@ class Level(db.Model):
     name = db.Column(db.String(100), unique=True, nullable=False)
     description = db.Column(db.Text)
     difficulty = db.Column(db.String(20))
-    rank = db.Column(db.Integer, nullable=True, unique=True)  # Rank 1-50, None for unranked
-    points = db.Column(db.Integer, default=0, nullable=False)  # Auto-calculated as 51 - rank
+    position = db.Column(OrderingKey, nullable=True, index=True)  # Ordering key (app.ordering), None for unranked
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     # Relationships
     claims = db.relationship('Claim', backref='level', lazy='dynamic')
 
-    def update_points(self):
-        """Update points based on rank (51 - rank for ranks 1-50, 0 for unranked)."""
-        if self.rank and 1 <= self.rank <= 50:
-            self.points = 51 - self.rank
-        else:
-            self.points = 0
+    @property
+    def rank(self):
+        """Rank 1-50 derived from the level's position, None for unranked."""
+        return _loaded_rank(self)
+
+    @property
+    def points(self):
+        """Points derived from rank (51 - rank for ranks 1-50, 0 for unranked)."""
+        return Level.points_for_rank(self.rank)
+
+    @staticmethod
+    def points_for_rank(rank):
+        """Points awarded for a rank (51 - rank for ranks 1-50, 0 for unranked)."""
+        if rank and 1 <= rank <= MAX_RANK:
+            return MAX_RANK + 1 - rank
+        return 0
+
+    @staticmethod
+    def ranking():
+        """
+        Subquery of (id, ordinal, rank, points) for every positioned level.
+
+        Ranks are numbered with a window function in one pass, for queries
+        that need the rank or points of many levels at once.
+        """
+        ordinal = func.row_number().over(order_by=(Level.position, Level.id))
+        numbered = select(Level.id, ordinal.label('ordinal'))\
+            .where(Level.position.isnot(None)).subquery()
+        return select(numbered.c.id, numbered.c.ordinal,
+                      *_rank_within(numbered.c.ordinal, MAX_RANK + 1)).subquery('level_ranking')
 
     def __repr__(self):
         return f'<Level {self.name}>'
@@ -95,21 +151,132 @@ class Claim(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     level_id = db.Column(db.Integer, db.ForeignKey('levels.id'), nullable=False, index=True)
     youtube_link = db.Column(db.String(255), nullable=False)
+    video_id = db.Column(db.String(11), index=True)  # Parsed from youtube_link on submission (app.utils.extract_youtube_id)
     user_notes = db.Column(db.Text)
     status = db.Column(db.String(20), default='pending', index=True)
-    rank = db.Column(db.Integer, nullable=True)
-    points = db.Column(db.Integer, default=0)
+    position = db.Column(OrderingKey, nullable=True)  # Ordering key within the level (app.ordering), None for unranked
     is_first_victor = db.Column(db.Boolean, default=False, nullable=False)
-    submitted_at = db.Column(db.DateTime, default=datetime.utcnow)
+    submitted_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)  # Keyset sort key
     reviewed_at = db.Column(db.DateTime)
     reviewed_by = db.Column(db.Integer, db.ForeignKey('users.id'))
     admin_notes = db.Column(db.Text)
 
     # Relationships
 
+    __table_args__ = (
+        db.Index('ix_claims_level_position', 'level_id', 'position'),
+        # Admin review queue: only pending rows, in keyset order
+        db.Index('ix_claims_pending_queue', 'submitted_at', 'id',
+                 postgresql_where=db.text("status = 'pending'"),
+                 sqlite_where=db.text("status = 'pending'")),
+    )
+
+    @property
+    def rank(self):
+        """Rank 1-50 within the level derived from the claim's position, None for unranked."""
+        return _loaded_rank(self)
+
+    @property
+    def points(self):
+        """Points derived from rank (51 - rank for ranks 1-50, 0 for unranked)."""
+        return Level.points_for_rank(self.rank)
+
+    @staticmethod
+    def ranking():
+        """
+        Subquery of (id, level_id, ordinal, rank, points) for every positioned approved claim.
+
+        Like Level.ranking(), numbered per level with a window function.
+        """
+        ordinal = func.row_number().over(partition_by=Claim.level_id, order_by=(Claim.position, Claim.id))
+        numbered = select(Claim.id, Claim.level_id, ordinal.label('ordinal'))\
+            .where(Claim.status == 'approved', Claim.position.isnot(None)).subquery()
+        return select(numbered.c.id, numbered.c.level_id, numbered.c.ordinal,
+                      *_rank_within(numbered.c.ordinal, MAX_RANK + 1)).subquery('claim_ranking')
+
     def __repr__(self):
         return f'<Claim {self.id} by User {self.user_id} for Level {self.level_id}>'
 
+# Ordinal of each row within its ordering (1 = first, may exceed MAX_RANK),
+# derived from the positions so that moving one row never rewrites the
+# others. Not loaded by default: queries that show ranks load it with
+# with_rank(), numbering all rows in one window-function pass; reading
+# .rank or .points without it raises RankNotLoaded.
+Level.position_rank = query_expression()
+Claim.position_rank = query_expression()
+
+
+def with_rank(query, model):
+    """
+    Load position_rank for the Level or Claim rows of a select or query.
+
+    For reads: the option stays attached to the loaded objects and would be
+    re-run without its join if they were refreshed, so after a change use
+    load_rank() instead.
+
+    Args:
+        query: Select or Query returning model instances
+        model: Level or Claim
+
+    Returns:
+        The query outer-joined to model.ranking()
+    """
+    ranking = model.ranking()
+    return query.outerjoin(ranking, ranking.c.id == model.id)\
+        .options(with_expression(model.position_rank, ranking.c.ordinal))
+
+
+def load_rank(obj):
+    """Load, or reload after its position changed, the position_rank of one Level or Claim."""
+    ranking = type(obj).ranking()
+    ordinal = db.session.scalar(select(ranking.c.ordinal).where(ranking.c.id == obj.id))
+    # Set directly rather than re-loading obj with with_expression(), which
+    # would stay attached to obj and be re-run, without its join, on refresh
+    set_committed_value(obj, 'position_rank', ordinal)
+    return obj
+
+class UserScore(db.Model):
+    """Materialized leaderboard totals, maintained by app.users.scores."""
+    __tablename__ = 'user_scores'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    total_points = db.Column(db.Integer, default=0, nullable=False)
+    completed_levels = db.Column(db.Integer, default=0, nullable=False)
+    first_victor_count = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    # Relationships
+    user = db.relationship('User', backref=db.backref('score', uselist=False, cascade='all, delete-orphan'))
+
+    __table_args__ = (
+        db.Index('ix_user_scores_ranking', total_points.desc(), user_id),
+    )
+
+    def __repr__(self):
+        return f'<UserScore {self.user_id}: {self.total_points} pts>'
+
+class DataVersion(db.Model):
+    """Single-row stamp bumped in the same transaction as any public data change."""
+    __tablename__ = 'data_versions'
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, default=0, nullable=False)
+    changed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<DataVersion {self.version} at {self.changed_at}>'
+
+class SiteCounter(db.Model):
+    """Running totals for dashboard and homepage stats, maintained by app.stats."""
+    __tablename__ = 'site_counters'
+
+    name = db.Column(db.String(32), primary_key=True)
+    value = db.Column(db.Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f'<SiteCounter {self.name}={self.value}>'
+
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    from app.identity import load_identity
+    return load_identity(int(user_id))
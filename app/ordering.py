@@ -0,0 +1,289 @@
+"""
+Gap-tolerant ordering keys for ranked lists.
+
+Levels and claims are ordered by a short string key instead of a stored
+rank. Keys compare byte-wise (they are stored with the "C" collation on
+PostgreSQL) and there is always room for another key between any two
+neighbours, so putting an item at a given rank writes only that item's row.
+Display ranks and points are derived from the order when read.
+
+Keys are base-62 fractions: "V" sits halfway between "" (the start of the
+list) and the end of the list, "F" halfway between "" and "V", and so on.
+A key never ends in "0", which guarantees a key can always be made that
+sorts before it.
+"""
+from sqlalchemy import case, literal, update
+from app import db
+
+DIGITS = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+BASE = len(DIGITS)
+
+# Keys longer than this trigger a respace of the whole list. Repeatedly
+# inserting at the same spot grows a key by one character roughly every
+# six inserts, so this is only reached after hundreds of such inserts.
+MAX_KEY_LENGTH = 48
+
+
+def _midpoint(a, b):
+    """Key strictly between a and b, where b may be None (end of list)."""
+    if b is not None:
+        # Share the common prefix, treating a as padded with '0'
+        n = 0
+        while n < len(b) and (a[n] if n < len(a) else '0') == b[n]:
+            n += 1
+        if n > 0:
+            return b[:n] + _midpoint(a[n:], b[n:])
+
+    digit_a = DIGITS.index(a[0]) if a else 0
+    digit_b = DIGITS.index(b[0]) if b is not None else BASE
+    if digit_b - digit_a > 1:
+        return DIGITS[(digit_a + digit_b) // 2]
+
+    # Adjacent digits: b's first digit alone sorts between them if b has more
+    if b is not None and len(b) > 1:
+        return b[0]
+    return DIGITS[digit_a] + _midpoint(a[1:], None)
+
+
+def key_between(a, b):
+    """
+    Generate a key that sorts strictly between two keys.
+
+    Args:
+        a: Lower key, or None for the start of the list
+        b: Upper key, or None for the end of the list
+
+    Returns:
+        str: New key
+    """
+    a = a or ''
+    if b is not None and a >= b:
+        raise ValueError(f'{a!r} must sort before {b!r}')
+    if a.endswith('0') or (b or '').endswith('0'):
+        raise ValueError('Keys must not end in "0"')
+    return _midpoint(a, b)
+
+
+def keys_between(a, b, count):
+    """
+    Generate count evenly spread keys between a and b.
+
+    Splitting the interval recursively keeps the keys short, unlike calling
+    key_between() repeatedly from the same side.
+
+    Returns:
+        list: count keys in ascending order
+    """
+    if count <= 0:
+        return []
+    mid = key_between(a, b)
+    half = count // 2
+    return keys_between(a, mid, half) + [mid] + keys_between(mid, b, count - half - 1)
+
+
+def spaced_keys(capacity):
+    """
+    Lazily generate keys of equal width spread evenly across the key space.
+
+    Yields up to capacity keys in ascending order, for bulk loads that take
+    keys one at a time without knowing in advance how many they will need.
+    """
+    width = 1
+    while BASE ** width <= capacity:
+        width += 1
+    step = BASE ** width // (capacity + 1)
+
+    for index in range(1, capacity + 1):
+        value = index * step
+        digits = []
+        for _ in range(width):
+            value, digit = divmod(value, BASE)
+            digits.append(DIGITS[digit])
+        yield ''.join(reversed(digits)).rstrip('0')
+
+
+def evenly_spaced_keys(count):
+    """
+    Generate count keys of equal width spread evenly across the key space.
+
+    Used for backfills and respacing.
+
+    Returns:
+        list: count keys in ascending order
+    """
+    return list(spaced_keys(count))
+
+
+def respace(ids):
+    """
+    Assign fresh, evenly spaced keys to a complete order.
+
+    Args:
+        ids: Item IDs in order
+
+    Returns:
+        dict: {item_id: key}
+    """
+    return dict(zip(ids, evenly_spaced_keys(len(ids))))
+
+
+def _changed(order, new_keys):
+    current = dict(order)
+    return {item_id: key for item_id, key in new_keys.items() if current.get(item_id) != key}
+
+
+def place(order, item_id, rank):
+    """
+    Work out the key writes needed to put one item at a rank.
+
+    Normally only the moved item gets a new key. If the keys around the
+    target are tied or have grown too long, the whole list is respaced.
+
+    Args:
+        order: [(item_id, key)] of the positioned items, in order
+        item_id: Item to move (may or may not be in order yet)
+        rank: 1-based target rank, or None to remove the item from the order
+
+    Returns:
+        dict: {item_id: new key or None} for every row that must be written
+    """
+    was_positioned = any(other_id == item_id for other_id, _ in order)
+    others = [(other_id, key) for other_id, key in order if other_id != item_id]
+
+    if rank is None:
+        return {item_id: None} if was_positioned else {}
+
+    index = min(max(rank, 1) - 1, len(others))
+    before = others[index - 1][1] if index > 0 else None
+    after = others[index][1] if index < len(others) else None
+
+    if before is None or after is None or before < after:
+        key = key_between(before, after)
+        if len(key) <= MAX_KEY_LENGTH:
+            return {item_id: key}
+
+    ids = [other_id for other_id, _ in others]
+    ids.insert(index, item_id)
+    return _changed(order, respace(ids))
+
+
+def reorder(order, ordered_ids):
+    """
+    Work out the key writes that turn the current order into ordered_ids.
+
+    The longest run of items that are already in the right relative order
+    keeps its keys; everything else gets a key between its new neighbours.
+    Items left out of ordered_ids are removed from the order.
+
+    Args:
+        order: [(item_id, key)] of the positioned items, in order
+        ordered_ids: Desired order of item IDs
+
+    Returns:
+        dict: {item_id: new key or None} for every row that must be written
+    """
+    current = dict(order)
+
+    # Longest increasing subsequence of the existing keys, in desired order
+    candidates = [(index, current[item_id]) for index, item_id in enumerate(ordered_ids) if item_id in current]
+    tails, tail_keys, parents = [], [], {}
+    for index, key in candidates:
+        lo, hi = 0, len(tail_keys)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if tail_keys[mid] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        parents[index] = tails[lo - 1] if lo > 0 else None
+        if lo == len(tails):
+            tails.append(index)
+            tail_keys.append(key)
+        else:
+            tails[lo] = index
+            tail_keys[lo] = key
+
+    kept = set()
+    index = tails[-1] if tails else None
+    while index is not None:
+        kept.add(index)
+        index = parents[index]
+
+    new_keys = {}
+    pending = []
+    lower = None
+    for index, item_id in enumerate(ordered_ids + [None]):
+        if item_id is not None and index not in kept:
+            pending.append(item_id)
+            continue
+        upper = current[item_id] if item_id is not None else None
+        new_keys.update(zip(pending, keys_between(lower, upper, len(pending))))
+        pending = []
+        lower = upper
+
+    if any(len(key) > MAX_KEY_LENGTH for key in new_keys.values()):
+        new_keys = respace(ordered_ids)
+
+    changes = _changed(order, new_keys)
+    listed = set(ordered_ids)
+    changes.update({item_id: None for item_id in current if item_id not in listed})
+    return changes
+
+
+def ranks(order):
+    """
+    Map an order to 1-based ranks.
+
+    Args:
+        order: [(item_id, key)] of the positioned items, in order
+
+    Returns:
+        dict: {item_id: rank}
+    """
+    return {item_id: index + 1 for index, (item_id, _) in enumerate(order)}
+
+
+def apply_positions(order, changes):
+    """
+    Return the order that results from writing changes.
+
+    Args:
+        order: [(item_id, key)] in order
+        changes: {item_id: key or None}
+
+    Returns:
+        list: New [(item_id, key)] in order
+    """
+    keys = dict(order)
+    keys.update(changes)
+    return sorted(((item_id, key) for item_id, key in keys.items() if key is not None),
+                  key=lambda item: (item[1], item[0]))
+
+
+def write_positions(model, changes):
+    """
+    Persist position changes with at most one UPDATE.
+
+    The position and derived rank of objects of model already loaded in the
+    session are expired so that they are re-read (the rank with
+    app.models.load_rank()). Does not commit.
+
+    Args:
+        model: Mapped class with id and position columns
+        changes: {item_id: key or None}
+    """
+    if not changes:
+        return
+
+    if len(changes) == 1:
+        (item_id, key), = changes.items()
+        statement = update(model).where(model.id == item_id).values(position=key)
+    else:
+        new_position = case({item_id: literal(key, model.position.type) for item_id, key in changes.items()},
+                            value=model.id)
+        statement = update(model).where(model.id.in_(changes)).values(position=new_position)
+    db.session.execute(statement.execution_options(synchronize_session=False))
+
+    for obj in list(db.session.identity_map.values()):
+        if isinstance(obj, model):
+            db.session.expire(obj, ['position', 'position_rank'])
@@ -0,0 +1,140 @@
+import base64
+import binascii
+import json
+from collections import namedtuple
+from datetime import datetime
+from sqlalchemy import and_, func, not_, or_, select
+from app import db
+
+# One page of results plus the opaque cursor for the page after it
+KeysetPage = namedtuple('KeysetPage', ['items', 'next_cursor'])
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor can't be decoded."""
+
+
+def encode_cursor(values):
+    """Encode the sort-key values of the last row on a page as a URL-safe string."""
+    payload = [{'dt': value.isoformat()} if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def _python_type(column):
+    """Python type of a sort-key column's values, or None if SQLAlchemy can't tell."""
+    try:
+        return column.type.python_type
+    except NotImplementedError:
+        return None
+
+
+def _valid_value(value, expected):
+    if expected is None:
+        return isinstance(value, (str, int, float, datetime))
+    if expected is float:
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    if expected is not bool and isinstance(value, bool):
+        return False
+    return isinstance(value, expected)
+
+
+def decode_cursor(cursor, types):
+    """
+    Decode a cursor made by encode_cursor().
+
+    Args:
+        cursor: Cursor string from the request
+        types: Expected Python type of each sort-key value (None for any)
+
+    Returns:
+        list: Sort-key values
+
+    Raises:
+        InvalidCursor: If the cursor can't be decoded or its values don't match types
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if not isinstance(payload, list):
+            raise InvalidCursor('Malformed cursor')
+        values = [datetime.fromisoformat(value['dt']) if isinstance(value, dict) else value for value in payload]
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise InvalidCursor('Malformed cursor')
+    # Values go straight into the WHERE clause; a wrong type would only fail in the database
+    if len(values) != len(types) or not all(map(_valid_value, values, types)):
+        raise InvalidCursor('Malformed cursor')
+    return values
+
+
+def _after(ordering, values):
+    """WHERE clause selecting the rows that sort after the given key values."""
+    clauses = []
+    for index, (column, direction) in enumerate(ordering):
+        beyond = column > values[index] if direction == 'asc' else column < values[index]
+        equal_prefix = [ordering[i][0] == values[i] for i in range(index)]
+        clauses.append(and_(*equal_prefix, beyond))
+    return or_(*clauses)
+
+
+def count_before(statement, ordering, cursor=None):
+    """
+    Count the rows of a SELECT that come before the page a cursor starts.
+
+    For numbering rows by position: the first row of the page is number
+    count_before() + 1. The count is a range scan over the sort key's index
+    instead of reading the skipped rows themselves.
+
+    Args:
+        statement: SELECT passed to keyset_paginate(), without ORDER BY or LIMIT
+        ordering: [(column, 'asc' or 'desc')] sort key passed to keyset_paginate()
+        cursor: Cursor of the page, or None for the first page
+
+    Returns:
+        int: Number of rows before the page
+
+    Raises:
+        InvalidCursor: If the cursor can't be decoded
+    """
+    if not cursor:
+        return 0
+    columns = [column for column, _ in ordering]
+    values = decode_cursor(cursor, [_python_type(column) for column in columns])
+    # The cursor holds the previous page's last row: count it and everything before
+    before = statement.where(not_(_after(ordering, values))).subquery()
+    return db.session.scalar(select(func.count()).select_from(before))
+
+
+def keyset_paginate(statement, ordering, cursor=None, per_page=50):
+    """
+    Fetch one page of a SELECT using keyset (seek) pagination.
+
+    Instead of OFFSET, the next page starts right after the sort key of the
+    previous page's last row, so every page costs the same no matter how
+    deep it is. The sort key must be unique and its columns non-nullable;
+    end it with a primary key.
+
+    Args:
+        statement: SELECT to paginate, without ORDER BY or LIMIT
+        ordering: [(column, 'asc' or 'desc')] sort key
+        cursor: Cursor from a previous page's next_cursor, or None for the first page
+        per_page: Page size
+
+    Returns:
+        KeysetPage: items are the statement's rows (or its single entity/column),
+                    next_cursor is None on the last page
+    """
+    columns = [column for column, _ in ordering]
+    width = len(statement.column_descriptions)
+
+    statement = statement.add_columns(*columns).order_by(
+        *(column.asc() if direction == 'asc' else column.desc() for column, direction in ordering)
+    )
+    if cursor:
+        statement = statement.where(_after(ordering, decode_cursor(cursor, [_python_type(column) for column in columns])))
+
+    # One extra row tells whether there is a next page
+    rows = db.session.execute(statement.limit(per_page + 1)).all()
+    next_cursor = encode_cursor(rows[per_page - 1][width:]) if len(rows) > per_page else None
+    rows = rows[:per_page]
+
+    items = [row[0] if width == 1 else tuple(row[:width]) for row in rows]
+    return KeysetPage(items, next_cursor)
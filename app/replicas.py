@@ -0,0 +1,83 @@
+"""
+Read-replica routing.
+
+When REPLICA_DATABASE_URL is set, config adds it as the "replica" bind
+and RoutingSession sends the reads of read-only requests there: GET,
+HEAD and OPTIONS requests outside the admin, auth and claims blueprints.
+Everything else, and any write or locking read even inside a read-only
+request, goes to the primary.
+
+Replicas lag behind the primary. So that users see their own changes,
+any write request marks the user's session to read from the primary for
+the next REPLICA_STICKY_SECONDS. Pages cached from a replica are keyed on
+the data version read from that same replica (app.cache), so they are
+never stored under a version newer than their content. Code that decides
+on a write from what it read uses primary_reads().
+"""
+import time
+from contextlib import contextmanager
+from flask import current_app, g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Select, UpdateBase
+
+REPLICA_BIND = 'replica'
+
+# Blueprints that write or must see the latest data even on GET
+PRIMARY_BLUEPRINTS = {'admin', 'auth', 'claims'}
+
+# Flask session key: time until which this user's reads go to the primary
+PRIMARY_UNTIL_KEY = 'read_primary_until'
+
+SAFE_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+
+def _reads_from_replica():
+    return has_request_context() and g.get('read_from_replica', False)
+
+
+class RoutingSession(Session):
+    """Session that reads from the replica bind during read-only requests."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and _reads_from_replica():
+            is_write = isinstance(clause, UpdateBase) or \
+                (isinstance(clause, Select) and clause._for_update_arg is not None)
+            replica = self._db.engines.get(REPLICA_BIND)
+            if replica is not None and not is_write:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@contextmanager
+def primary_reads():
+    """Read from the primary inside the block, e.g. to decide on a write from fresh data."""
+    previous = g.get('read_from_replica', False) if has_request_context() else False
+    if previous:
+        g.read_from_replica = False
+    try:
+        yield
+    finally:
+        if previous:
+            g.read_from_replica = True
+
+
+def _route_request():
+    if REPLICA_BIND not in current_app.config.get('SQLALCHEMY_BINDS', {}):
+        return
+    g.read_from_replica = (
+        request.method in SAFE_METHODS
+        and request.blueprint not in PRIMARY_BLUEPRINTS
+        and session.get(PRIMARY_UNTIL_KEY, 0) < time.time()
+    )
+
+
+def _stick_to_primary(response):
+    if request.method not in SAFE_METHODS and \
+            REPLICA_BIND in current_app.config.get('SQLALCHEMY_BINDS', {}):
+        session[PRIMARY_UNTIL_KEY] = time.time() + current_app.config.get('REPLICA_STICKY_SECONDS', 10)
+    return response
+
+
+def init_app(app):
+    app.before_request(_route_request)
+    app.after_request(_stick_to_primary)
@@ -49,3 +49,27 @@ document.querySelectorAll('a[href^="#"]').forEach(anchor => {
         }
     });
 });
+
+// Video facades (_video.html): load the YouTube player only when asked for
+function loadVideoFacade(facade, autoplay) {
+    const iframe = document.createElement('iframe');
+    iframe.src = 'https://www.youtube.com/embed/' + encodeURIComponent(facade.dataset.videoId) + (autoplay ? '?autoplay=1' : '');
+    iframe.title = facade.dataset.title;
+    iframe.allow = 'accelerometer; autoplay; clipboard-write; encrypted-media; gyroscope; picture-in-picture; web-share';
+    iframe.allowFullscreen = true;
+    facade.replaceChildren(iframe);
+    facade.classList.remove('video-facade');
+}
+
+document.addEventListener('click', function(e) {
+    const facade = e.target.closest('.video-facade');
+    if (facade) {
+        loadVideoFacade(facade, true);
+    }
+});
+
+document.addEventListener('shown.bs.collapse', function(e) {
+    e.target.querySelectorAll('.video-facade').forEach(function(facade) {
+        loadVideoFacade(facade, false);
+    });
+});
@@ -0,0 +1,136 @@
+import logging
+from collections import Counter
+from sqlalchemy import case, delete, event, func, insert, inspect, literal, select, update
+from sqlalchemy.orm import Session, object_session
+from app.models import Claim, Level, SiteCounter, User
+from app import db
+
+logger = logging.getLogger(__name__)
+
+# Session.info key holding counter deltas collected during a flush
+PENDING_DELTAS_KEY = 'site_counter_deltas'
+
+# Counter names, one per claim status plus the row counts shown on the dashboard
+CLAIM_STATUS_COUNTERS = {
+    'pending': 'pending_count',
+    'approved': 'approved_count',
+    'rejected': 'rejected_count'
+}
+COUNTERS = list(CLAIM_STATUS_COUNTERS.values()) + ['total_users', 'total_levels']
+
+
+def _counts_query():
+    """Single aggregate over claims, with the user and level counts as scalar subqueries."""
+    return select(
+        *(func.count(case((Claim.status == status, 1))).label(name)
+          for status, name in CLAIM_STATUS_COUNTERS.items()),
+        select(func.count(User.id)).scalar_subquery().label('total_users'),
+        select(func.count(Level.id)).scalar_subquery().label('total_levels')
+    ).select_from(Claim)
+
+
+def rebuild_site_stats():
+    """
+    Recompute every counter from the tables in one aggregate query.
+
+    Does not commit.
+
+    Returns:
+        dict: {counter name: value}
+    """
+    counts = db.session.execute(_counts_query()).one()._asdict()
+    db.session.execute(delete(SiteCounter))
+    db.session.execute(insert(SiteCounter), [{'name': name, 'value': value} for name, value in counts.items()])
+    return counts
+
+
+def get_site_stats():
+    """
+    Read the site counters with a single primary-key scan of site_counters.
+
+    Never writes: the rows are created by the migration that adds the table
+    and by `flask rebuild-stats`. A missing counter (e.g. a database created
+    without migrations) reads as 0 until the stats are rebuilt.
+
+    Returns:
+        dict: {'pending_count', 'approved_count', 'rejected_count', 'total_users', 'total_levels'}
+    """
+    stats = dict(db.session.execute(select(SiteCounter.name, SiteCounter.value)).all())
+    missing = [name for name in COUNTERS if name not in stats]
+    if missing:
+        logger.warning('Site counters %s are missing; run `flask rebuild-stats`', ', '.join(missing))
+    return {name: stats.get(name, 0) for name in COUNTERS}
+
+
+def _deltas(target):
+    session = object_session(target)
+    return session.info.setdefault(PENDING_DELTAS_KEY, Counter()) if session is not None else Counter()
+
+
+@event.listens_for(Claim, 'after_insert')
+def _claim_inserted(mapper, connection, target):
+    _deltas(target)[CLAIM_STATUS_COUNTERS.get(target.status)] += 1
+
+
+@event.listens_for(Claim, 'after_update')
+def _claim_updated(mapper, connection, target):
+    history = inspect(target).attrs.status.history
+    if not history.has_changes():
+        return
+    deltas = _deltas(target)
+    for old_status in history.deleted:
+        deltas[CLAIM_STATUS_COUNTERS.get(old_status)] -= 1
+    for new_status in history.added:
+        deltas[CLAIM_STATUS_COUNTERS.get(new_status)] += 1
+
+
+@event.listens_for(Claim, 'after_delete')
+def _claim_deleted(mapper, connection, target):
+    history = inspect(target).attrs.status.history
+    for status in history.deleted or history.unchanged or history.added:
+        _deltas(target)[CLAIM_STATUS_COUNTERS.get(status)] -= 1
+
+
+@event.listens_for(User, 'after_insert')
+def _user_inserted(mapper, connection, target):
+    _deltas(target)['total_users'] += 1
+
+
+@event.listens_for(User, 'after_delete')
+def _user_deleted(mapper, connection, target):
+    _deltas(target)['total_users'] -= 1
+
+
+@event.listens_for(Level, 'after_insert')
+def _level_inserted(mapper, connection, target):
+    _deltas(target)['total_levels'] += 1
+
+
+@event.listens_for(Level, 'after_delete')
+def _level_deleted(mapper, connection, target):
+    _deltas(target)['total_levels'] -= 1
+
+
+@event.listens_for(Session, 'after_flush')
+def _apply_counter_deltas(session, flush_context):
+    """Add the deltas collected during this flush to site_counters in one UPDATE."""
+    deltas = session.info.pop(PENDING_DELTAS_KEY, None)
+    if not deltas:
+        return
+    deltas = {name: delta for name, delta in deltas.items() if name is not None and delta}
+    if not deltas:
+        return
+
+    # Plain connection execute: the session is still mid-flush
+    session.connection().execute(
+        update(SiteCounter)
+        .where(SiteCounter.name.in_(deltas))
+        .values(value=SiteCounter.value + case(
+            {name: literal(delta) for name, delta in deltas.items()}, value=SiteCounter.name
+        ))
+    )
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_counter_deltas(session, previous_transaction):
+    session.info.pop(PENDING_DELTAS_KEY, None)
@@ -0,0 +1,73 @@
+"""
+Content-addressed file storage.
+
+Blobs are stored under the SHA-256 of their bytes, so identical uploads
+share one file and a name never changes meaning once written.
+"""
+import hashlib
+import os
+import tempfile
+
+CHUNK_SIZE = 64 * 1024
+
+
+def blob_path(directory, digest):
+    """Path of a blob, fanned out by the first two hex digits of its hash."""
+    return os.path.join(directory, digest[:2], digest)
+
+
+def store_stream(stream, directory):
+    """
+    Stream a file into the store while hashing it.
+
+    The data is written to a temporary file next to its final location and
+    only renamed into place once the hash is known. If a blob with the same
+    hash already exists the temporary file is discarded instead.
+
+    Args:
+        stream: Binary file object, read in chunks until EOF
+        directory: Store root
+
+    Returns:
+        tuple: (hex digest, path of the stored blob, whether it was newly created)
+    """
+    os.makedirs(directory, exist_ok=True)
+    digest = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+                f.write(chunk)
+
+        hex_digest = digest.hexdigest()
+        path = blob_path(directory, hex_digest)
+        if os.path.exists(path):
+            os.remove(tmp_path)
+            return hex_digest, path, False
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+        return hex_digest, path, True
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_file(path, data):
+    """Write bytes to path atomically (readers never see a partial file)."""
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def remove_file(path):
+    """Delete a file, ignoring files that are already gone. Returns bytes freed."""
+    try:
+        size = os.path.getsize(path)
+        os.remove(path)
+        return size
+    except OSError:
+        return 0
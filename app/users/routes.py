@@ -1,52 +1,69 @@
-from flask import render_template, abort, redirect, url_for, flash, request, current_app
+from collections import namedtuple
+from flask import render_template, abort, redirect, url_for, flash, request
 from flask_login import current_user, login_required
-from werkzeug.utils import secure_filename
-import os
 from app.users import users_bp
-from app.models import User, Claim, Level
+from app.avatars import AvatarError, save_avatar
+from sqlalchemy import and_, case, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import contains_eager
+from sqlalchemy.orm.exc import StaleDataError
+from app import db, page_cache
+from app.cache import mark_data_changed
+from app.identity import handle_missing_user, invalidate_identity
+from app.conditional import conditional_page
+from app.models import User, Claim, Level, with_rank
+from app.pagination import InvalidCursor, keyset_paginate
 from app.claims.forms import EditProfileForm
-from collections import defaultdict
+from app.users.utils import get_profile_stats
+
+PROFILE_LEVELS_PAGE_SIZE = 20
+
+# Per-level badges on the profile, counted over all of the user's claims for the level
+LevelSummary = namedtuple('LevelSummary', ['level_id', 'claim_count', 'approved_count', 'first_victor_count'])
 
 @users_bp.route('/<username>')
+@conditional_page
+@page_cache.cached()
 def profile(username):
     """Display user profile with claims grouped by level."""
     user = User.query.filter_by(username=username).first_or_404()
 
-    # Get all user's claims
-    claims = Claim.query.filter_by(user_id=user.id).all()
-
-    # Group claims by level
-    claims_by_level = defaultdict(list)
-    for claim in claims:
-        claims_by_level[claim.level.name].append(claim)
+    stats = get_profile_stats(user.id)
+    approved = Claim.status == 'approved'
 
-    # Sort claims within each level by status and submission date
-    for level_name in claims_by_level:
-        claims_by_level[level_name].sort(
-            key=lambda c: (c.status != 'approved', c.submitted_at),
-            reverse=True
+    # One page of the levels the user has claimed, by level name, with their
+    # badges counted in the same grouped query
+    try:
+        page = keyset_paginate(
+            select(
+                Level.id,
+                func.count(Claim.id).label('claim_count'),
+                func.count(case((approved, 1))).label('approved_count'),
+                func.count(case((and_(approved, Claim.is_first_victor.is_(True)), 1))).label('first_victor_count')
+            ).join(Claim, Claim.level_id == Level.id)
+            .where(Claim.user_id == user.id)
+            .group_by(Level.id, Level.name),
+            [(Level.name, 'asc'), (Level.id, 'asc')],
+            cursor=request.args.get('cursor'),
+            per_page=PROFILE_LEVELS_PAGE_SIZE
         )
+    except InvalidCursor:
+        abort(400)
+    level_summaries = {summary.level_id: summary for summary in map(LevelSummary._make, page.items)}
 
-    # Sort levels by name
-    sorted_levels = sorted(claims_by_level.items())
+    # Every claim for those levels, so no level is split across pages;
+    # within a level, unreviewed/rejected first then newest first
+    claims = []
+    if level_summaries:
+        claims = db.session.scalars(
+            with_rank(select(Claim), Claim).join(Claim.level).options(contains_eager(Claim.level))
+            .where(Claim.user_id == user.id, Claim.level_id.in_(list(level_summaries)))
+            .order_by(Level.name, Level.id, case((approved, 0), else_=1).desc(),
+                      Claim.submitted_at.desc(), Claim.id.desc())
+        ).all()
 
-    # Calculate statistics
-    approved_claims = [c for c in claims if c.status == 'approved']
-    total_points = user.get_total_points()
-    completed_levels = len(set(c.level_id for c in approved_claims))
-    first_victor_count = len([c for c in approved_claims if c.is_first_victor])
-
-    stats = {
-        'total_points': total_points,
-        'total_claims': len(claims),
-        'approved_count': len(approved_claims),
-        'pending_count': len([c for c in claims if c.status == 'pending']),
-        'rejected_count': len([c for c in claims if c.status == 'rejected']),
-        'completed_levels': completed_levels,
-        'first_victor_count': first_victor_count
-    }
-
-    return render_template('users/profile.html', user=user, claims_by_level=sorted_levels, stats=stats)
+    return render_template('users/profile.html', user=user, claims=claims, next_cursor=page.next_cursor,
+                           level_summaries=level_summaries, stats=stats)
 
 @users_bp.route('/edit-profile', methods=['GET', 'POST'])
 @login_required
@@ -62,16 +79,25 @@ def edit_profile():
                 return redirect(url_for('users.edit_profile'))
             current_user.username = form.username.data
 
-        # Handle profile picture upload
+        # Handle profile picture upload: stored by content hash, then
+        # resized, stripped and re-encoded; the old files are left for
+        # `flask gc-uploads` since other users may share them
         if form.profile_picture.data:
-            filename = secure_filename(form.profile_picture.data.filename)
-            filepath = os.path.join(current_app.root_path, 'static', 'uploads', filename)
-            form.profile_picture.data.save(filepath)
-            current_user.profile_picture = filename
+            try:
+                current_user.profile_picture = save_avatar(form.profile_picture.data.stream)
+            except AvatarError as e:
+                db.session.rollback()
+                flash(f'Could not use that picture: {e}', 'danger')
+                return redirect(url_for('users.edit_profile'))
 
         # Save changes
-        from app import db
-        db.session.commit()
+        mark_data_changed()
+        invalidate_identity(current_user.id)
+        try:
+            db.session.commit()
+        except (IntegrityError, StaleDataError) as e:
+            # The user may have been deleted while another worker still had them cached
+            return handle_missing_user(e)
         flash('Profile updated successfully!', 'success')
         return redirect(url_for('users.profile', username=current_user.username))
 
@@ -0,0 +1,97 @@
+from datetime import datetime
+from sqlalchemy import case, delete, func, insert, literal, select
+from app.models import Claim, Level, UserScore
+from app import db
+
+
+SCORE_COLUMNS = ['user_id', 'total_points', 'completed_levels', 'first_victor_count', 'updated_at']
+
+
+def _score_query(user_ids=None):
+    """
+    Build the aggregate SELECT that produces one user_scores row per user.
+
+    Points are summed once per completed level (one approved claim per level
+    counts), matching User.get_total_points().
+
+    Args:
+        user_ids: Iterable or SELECT of user IDs to restrict to, or None for all users
+
+    Returns:
+        Select: (user_id, total_points, completed_levels, first_victor_count, updated_at)
+    """
+    completions = select(
+        Claim.user_id.label('user_id'),
+        Claim.level_id.label('level_id'),
+        func.sum(case((Claim.is_first_victor.is_(True), 1), else_=0)).label('first_victor_count')
+    ).where(Claim.status == 'approved')
+
+    if user_ids is not None:
+        completions = completions.where(Claim.user_id.in_(user_ids))
+
+    completions = completions.group_by(Claim.user_id, Claim.level_id).subquery()
+
+    # Level points are derived from the level ordering; unpositioned levels
+    # have no ranking row and count as completed with 0 points
+    ranking = Level.ranking()
+
+    return select(
+        completions.c.user_id,
+        func.coalesce(func.sum(ranking.c.points), 0),
+        func.count(),
+        func.sum(completions.c.first_victor_count),
+        literal(datetime.utcnow(), db.DateTime)
+    ).join(Level, Level.id == completions.c.level_id)\
+        .outerjoin(ranking, ranking.c.id == completions.c.level_id)\
+        .group_by(completions.c.user_id)
+
+
+def refresh_user_scores(user_ids):
+    """
+    Recompute the materialized scores of the given users.
+
+    Runs inside the caller's transaction; the caller is responsible for
+    committing so the scores change atomically with the claims/levels.
+
+    Args:
+        user_ids: Iterable of user IDs, or a SELECT returning user IDs
+    """
+    if not hasattr(user_ids, 'subquery'):
+        user_ids = {user_id for user_id in user_ids if user_id is not None}
+        if not user_ids:
+            return
+
+    db.session.execute(delete(UserScore).where(UserScore.user_id.in_(user_ids)))
+    db.session.execute(insert(UserScore).from_select(SCORE_COLUMNS, _score_query(user_ids)))
+
+
+def refresh_scores_for_levels(level_ids):
+    """
+    Recompute the scores of every user with an approved claim on the given levels.
+
+    Used when level points change (a level moving shifts the ranks of the levels around it).
+
+    Args:
+        level_ids: Iterable of level IDs
+    """
+    level_ids = {level_id for level_id in level_ids if level_id is not None}
+    if not level_ids:
+        return
+
+    affected_users = select(Claim.user_id).where(
+        Claim.level_id.in_(level_ids),
+        Claim.status == 'approved'
+    ).distinct()
+    refresh_user_scores(affected_users)
+
+
+def rebuild_user_scores():
+    """
+    Rebuild the whole user_scores table from approved claims.
+
+    Returns:
+        int: Number of users with a score row
+    """
+    db.session.execute(delete(UserScore))
+    db.session.execute(insert(UserScore).from_select(SCORE_COLUMNS, _score_query()))
+    return db.session.query(func.count(UserScore.user_id)).scalar()
@@ -1,12 +1,56 @@
-from app.models import Claim, Level
+from sqlalchemy import and_, case, func, select
+from app.models import Claim, Level, MAX_RANK, UserScore
+from app.ordering import evenly_spaced_keys, place, write_positions
+from app.users.scores import refresh_user_scores
+from app.cache import mark_data_changed
 from app import db
 import logging
 
 
+def load_claim_order(level_id):
+    """
+    Load the ordering keys of a level's positioned approved claims.
+
+    Returns:
+        list: [(claim_id, position)] in order
+    """
+    return db.session.execute(
+        select(Claim.id, Claim.position)
+        .where(Claim.level_id == level_id, Claim.status == 'approved', Claim.position.isnot(None))
+        .order_by(Claim.position, Claim.id)
+    ).all()
+
+
+def get_profile_stats(user_id):
+    """
+    All of a user's profile statistics in one aggregate query with conditional counts.
+
+    Returns:
+        dict: {'total_points', 'total_claims', 'approved_count', 'pending_count',
+               'rejected_count', 'completed_levels', 'first_victor_count'}
+    """
+    approved = Claim.status == 'approved'
+    total_points = select(UserScore.total_points).where(UserScore.user_id == user_id).scalar_subquery()
+    return db.session.execute(
+        select(
+            func.coalesce(total_points, 0).label('total_points'),
+            func.count(Claim.id).label('total_claims'),
+            func.count(case((approved, 1))).label('approved_count'),
+            func.count(case((Claim.status == 'pending', 1))).label('pending_count'),
+            func.count(case((Claim.status == 'rejected', 1))).label('rejected_count'),
+            func.count(case((approved, Claim.level_id)).distinct()).label('completed_levels'),
+            func.count(case((and_(approved, Claim.is_first_victor.is_(True)), 1))).label('first_victor_count')
+        ).where(Claim.user_id == user_id)
+    ).one()._asdict()
+
 def assign_rank_to_claim(claim, new_rank, admin_id=None):
     """
     Assign a specific rank (1-50 or None) to a claim within its level.
 
+    The level row is locked first, so concurrent rank changes in the same
+    level run one after another. Only the claim's own ordering key is
+    written; the other claims' ranks and points follow from their positions.
+
     Args:
         claim: Claim object to rank
         new_rank: Integer 1-50 or None (for unranked)
@@ -20,98 +64,25 @@ def assign_rank_to_claim(claim, new_rank, admin_id=None):
 
     # Validate rank
     if new_rank is not None:
-        if not isinstance(new_rank, int) or new_rank < 1 or new_rank > 50:
-            return (False, 'Rank must be between 1 and 50, or None for unranked')
+        if not isinstance(new_rank, int) or new_rank < 1 or new_rank > MAX_RANK:
+            return (False, f'Rank must be between 1 and {MAX_RANK}, or None for unranked')
+
+    mark_data_changed()
 
     try:
-        # If setting to unranked
-        if new_rank is None:
-            old_rank = claim.rank
-            claim.rank = None
-            claim.points = 0
-
-            # If claim had a rank, close the gap by shifting claims up
-            if old_rank and 1 <= old_rank <= 50:
-                claims_to_shift_up = Claim.query.filter(
-                    Claim.level_id == claim.level_id,
-                    Claim.rank > old_rank,
-                    Claim.rank <= 50,
-                    Claim.status == 'approved',
-                    Claim.id != claim.id
-                ).order_by(Claim.rank.asc()).all()
-
-                for c in claims_to_shift_up:
-                    c.rank = c.rank - 1
-                    c.points = 51 - c.rank
-
-            db.session.commit()
-            return (True, f'Claim #{claim.id} set to unranked')
+        # Serialize rankers of this level (no-op on SQLite)
+        db.session.execute(select(Level.id).where(Level.id == claim.level_id).with_for_update())
 
-        # Remember old rank to handle gaps
-        old_rank = claim.rank
-
-        # Handle rank adjustment based on movement direction
-        if old_rank and 1 <= old_rank <= 50 and old_rank != new_rank:
-            # Claim is moving from one rank to another
-            if old_rank < new_rank:
-                # Moving down (e.g., rank 3 to rank 7)
-                # Claims between old_rank and new_rank shift up
-                claims_to_shift_up = Claim.query.filter(
-                    Claim.level_id == claim.level_id,
-                    Claim.rank > old_rank,
-                    Claim.rank <= new_rank,
-                    Claim.status == 'approved',
-                    Claim.id != claim.id
-                ).order_by(Claim.rank.asc()).all()
-
-                for c in claims_to_shift_up:
-                    c.rank = c.rank - 1
-                    c.points = 51 - c.rank
-
-            else:  # old_rank > new_rank
-                # Moving up (e.g., rank 7 to rank 3)
-                # Claims between new_rank and old_rank shift down
-                claims_to_shift_down = Claim.query.filter(
-                    Claim.level_id == claim.level_id,
-                    Claim.rank >= new_rank,
-                    Claim.rank < old_rank,
-                    Claim.status == 'approved',
-                    Claim.id != claim.id
-                ).order_by(Claim.rank.desc()).all()
-
-                for c in claims_to_shift_down:
-                    c.rank = c.rank + 1
-                    if c.rank > 50:
-                        c.rank = None
-                        c.points = 0
-                    else:
-                        c.points = 51 - c.rank
-
-        elif not old_rank or old_rank > 50:
-            # Claim is being ranked for the first time or was unranked
-            # Shift all claims at new_rank and below down by 1
-            claims_to_shift_down = Claim.query.filter(
-                Claim.level_id == claim.level_id,
-                Claim.rank >= new_rank,
-                Claim.rank <= 50,
-                Claim.status == 'approved',
-                Claim.id != claim.id
-            ).order_by(Claim.rank.desc()).all()
-
-            for c in claims_to_shift_down:
-                c.rank = c.rank + 1
-                if c.rank > 50:
-                    c.rank = None
-                    c.points = 0
-                else:
-                    c.points = 51 - c.rank
-
-        # Assign the new rank
-        claim.rank = new_rank
-        claim.points = 51 - new_rank
+        # Read the ordering under the lock; another admin may have just moved a claim
+        changes = place(load_claim_order(claim.level_id), claim.id, new_rank)
+        write_positions(Claim, changes)
 
+        refresh_user_scores([claim.user_id])
         db.session.commit()
 
+        if new_rank is None:
+            return (True, f'Claim #{claim.id} set to unranked')
+
         level_name = claim.level.name if claim.level else f'Level #{claim.level_id}'
         return (True, f'Claim #{claim.id} assigned rank #{new_rank} in {level_name}')
 
@@ -125,6 +96,9 @@ def get_level_rank_distribution(level_id):
     """
     Get current rank distribution for a level.
 
+    Ranks are derived from the claims' ordering keys, so they never have
+    gaps: the ranked claims always hold ranks 1..ranked_count.
+
     Args:
         level_id: ID of the level
 
@@ -132,69 +106,25 @@ def get_level_rank_distribution(level_id):
         dict: {
             'ranked_count': Number of claims with ranks 1-50,
             'unranked_count': Number of approved claims without rank,
-            'next_available_rank': Lowest unused rank 1-50 or None if full,
-            'rank_gaps': List of unused ranks within 1-50
+            'next_available_rank': Rank a newly ranked claim would get at the bottom, or None if full,
+            'rank_gaps': Always empty, kept for templates
         }
     """
-    # Count ranked claims
-    ranked_claims = Claim.query.filter_by(
-        level_id=level_id,
-        status='approved'
-    ).filter(Claim.rank.isnot(None)).all()
-
-    # Count unranked approved claims
-    unranked_count = Claim.query.filter_by(
-        level_id=level_id,
-        status='approved'
-    ).filter(Claim.rank.is_(None)).count()
-
-    # Find occupied ranks
-    occupied_ranks = {claim.rank for claim in ranked_claims if claim.rank and 1 <= claim.rank <= 50}
+    approved_count, positioned_count = db.session.execute(
+        select(func.count(Claim.id), func.count(Claim.position))
+        .where(Claim.level_id == level_id, Claim.status == 'approved')
+    ).one()
 
-    # Find gaps in 1-50
-    all_ranks = set(range(1, 51))
-    rank_gaps = sorted(all_ranks - occupied_ranks)
-
-    # Next available rank
-    next_available = rank_gaps[0] if rank_gaps else None
+    ranked_count = min(positioned_count, MAX_RANK)
 
     return {
-        'ranked_count': len(occupied_ranks),
-        'unranked_count': unranked_count,
-        'next_available_rank': next_available,
-        'rank_gaps': rank_gaps
+        'ranked_count': ranked_count,
+        'unranked_count': approved_count - ranked_count,
+        'next_available_rank': ranked_count + 1 if ranked_count < MAX_RANK else None,
+        'rank_gaps': []
     }
 
 
-def recalculate_points_for_level(level_id):
-    """
-    Recalculate points for all claims in a level based on current ranks.
-    Points are calculated as 51 - rank for ranks 1-50, 0 for unranked.
-
-    Args:
-        level_id: ID of the level
-
-    Returns:
-        int: Number of claims updated
-    """
-    claims = Claim.query.filter_by(
-        level_id=level_id,
-        status='approved'
-    ).all()
-
-    updated_count = 0
-    for claim in claims:
-        if claim.rank and 1 <= claim.rank <= 50:
-            claim.points = 51 - claim.rank
-            updated_count += 1
-        else:
-            claim.points = 0
-            updated_count += 1
-
-    db.session.commit()
-    return updated_count
-
-
 def recalculate_ranks():
     """
     DEPRECATED: This function calculated global ranks based on votes.
@@ -210,13 +140,8 @@ def recalculate_ranks():
         .order_by(Claim.vote_count.desc(), Claim.submitted_at.asc())\
         .all()
 
-    for index, claim in enumerate(approved_claims):
-        claim.rank = index + 1
-
-        if claim.rank <= 50:
-            claim.points = 51 - claim.rank
-        else:
-            claim.points = 0
+    for claim, position in zip(approved_claims, evenly_spaced_keys(len(approved_claims))):
+        claim.position = position
 
     db.session.commit()
     return len(approved_claims)
@@ -1,16 +1,18 @@
 import re
 
+# The one YouTube URL parser: watch, short (youtu.be), embed, shorts and live
+# links on youtube.com, its www/m/music subdomains and youtube-nocookie.com.
+# Video IDs are always 11 characters from the URL-safe base64 alphabet.
+YOUTUBE_URL = re.compile(
+    r'^(?:https?://)?(?:(?:www|m|music)\.)?'
+    r'(?:youtu\.be/|youtube(?:-nocookie)?\.com/(?:watch\?(?:[^#\s]*&)?v=|embed/|shorts/|live/|v/))'
+    r'(?P<video_id>[A-Za-z0-9_-]{11})(?![A-Za-z0-9_-])',
+    re.IGNORECASE
+)
+
 def extract_youtube_id(url):
-    """Extract YouTube video ID from various URL formats."""
+    """Extract the YouTube video ID from a link, or None if it isn't a YouTube video link."""
     if not url:
         return None
-    patterns = [
-        r'(?:youtube\.com\/watch\?v=)([^&\s]+)',
-        r'(?:youtu\.be\/)([^&\s]+)',
-        r'(?:youtube\.com\/embed\/)([^&\s]+)'
-    ]
-    for pattern in patterns:
-        match = re.search(pattern, url)
-        if match:
-            return match.group(1)
-    return None
\ No newline at end of file
+    match = YOUTUBE_URL.match(url.strip())
+    return match.group('video_id') if match else None
\ No newline at end of file
@@ -5,5 +5,6 @@ set -euo pipefail
 echo "Running DB migrations..."
 flask db upgrade
 
+# Workers, threads and bind address come from gunicorn.conf.py
 echo "Starting Gunicorn..."
-exec gunicorn run:app --bind 0.0.0.0:${PORT:-8000} --workers ${WEB_CONCURRENCY:-1}
+exec gunicorn run:app
@@ -1,9 +1,18 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 basedir = os.path.abspath(os.path.dirname(__file__))
 load_dotenv(os.path.join(basedir, '.env'))
 
+def web_workers():
+    """Gunicorn worker processes: WEB_CONCURRENCY, or two per CPU plus one."""
+    return int(os.environ.get('WEB_CONCURRENCY') or (os.cpu_count() or 1) * 2 + 1)
+
+def web_threads():
+    """Request threads per Gunicorn worker (gthread worker class)."""
+    return int(os.environ.get('GUNICORN_THREADS', 4))
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'hard-to-guess-string-change-in-production'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
@@ -13,6 +22,55 @@ class Config:
     SESSION_COOKIE_HTTPONLY = True
     SESSION_COOKIE_SAMESITE = 'Lax'
 
+    # Largest accepted request body (profile picture uploads)
+    MAX_CONTENT_LENGTH = 5 * 1024 * 1024
+
+    # Uploaded files, served under /media. Point this outside app/static in
+    # production so stored originals can't be fetched through /static
+    UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER') or \
+        os.path.join(basedir, 'app', 'static', 'uploads')
+
+    # Hand media file bodies to the front proxy instead of streaming them
+    # from Python: USE_X_SENDFILE for Apache/lighttpd, or the internal
+    # nginx location mapped to UPLOAD_FOLDER for X-Accel-Redirect
+    USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE', '0') == '1'
+    MEDIA_ACCEL_REDIRECT_PREFIX = os.environ.get('MEDIA_ACCEL_REDIRECT_PREFIX')
+
+    # Page cache for public pages: 'memory' (per process), 'file' (shared
+    # by all workers on the host through PAGE_CACHE_DIR) or 'none'
+    PAGE_CACHE_BACKEND = os.environ.get('PAGE_CACHE_BACKEND', 'memory')
+    PAGE_CACHE_DIR = os.environ.get('PAGE_CACHE_DIR') or \
+        os.path.join(tempfile.gettempdir(), 'flying-demon-list-cache')
+    PAGE_CACHE_MAX_ENTRIES = int(os.environ.get('PAGE_CACHE_MAX_ENTRIES', 500))
+    PAGE_CACHE_TTL = int(os.environ.get('PAGE_CACHE_TTL', 300))  # seconds
+
+    # Seconds a logged-in user's row is reused from the per-process identity
+    # cache (app.identity) instead of being loaded on every request; 0 disables
+    IDENTITY_CACHE_TTL = int(os.environ.get('IDENTITY_CACHE_TTL', 30))
+
+    # Optional read replica (app.replicas): read-only requests read from it,
+    # and a user's reads stay on the primary for REPLICA_STICKY_SECONDS
+    # after each of their writes so they see their own changes
+    SQLALCHEMY_BINDS = {'replica': os.environ['REPLICA_DATABASE_URL']} \
+        if os.environ.get('REPLICA_DATABASE_URL') else {}
+    REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 10))
+
+    # Per-request SQL/render timing (app.instrumentation), sent as a
+    # Server-Timing header and logged on "app.requests". A statement shape
+    # repeated SQL_REPEAT_THRESHOLD times in one request is logged as an N+1
+    REQUEST_INSTRUMENTATION = os.environ.get('REQUEST_INSTRUMENTATION', '1') == '1'
+    SERVER_TIMING = os.environ.get('SERVER_TIMING', '1') == '1'
+    SQL_REPEAT_THRESHOLD = int(os.environ.get('SQL_REPEAT_THRESHOLD', 5))
+
+    # Level of the "app" logger and its children ("app.requests",
+    # "app.bootstrap"), which log to stderr through Flask's default handler
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+
+    # Prometheus /metrics (app.metrics); with METRICS_TOKEN set, scrapes
+    # must send "Authorization: Bearer <token>"
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
 class DevelopmentConfig(Config):
     DEBUG = True
     SQLALCHEMY_DATABASE_URI = os.environ.get('DEV_DATABASE_URL') or \
@@ -26,14 +84,48 @@ class ProductionConfig(Config):
     SESSION_COOKIE_SECURE = True  # HTTPS only
     PERMANENT_SESSION_LIFETIME = 3600  # 1 hour
 
+    # /metrics answers 403 until METRICS_TOKEN is set
+    METRICS_TOKEN_REQUIRED = True
+
+    # Server-Timing exposes query counts and timings to every visitor
+    SERVER_TIMING = os.environ.get('SERVER_TIMING', '0') == '1'
+
+    # One pooled connection per request thread, plus a little overflow for
+    # the odd request that opens a second one. The server then holds at most
+    # web_workers() * (pool_size + max_overflow) connections, which must stay
+    # below the database's max_connections
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.environ.get('DATABASE_POOL_SIZE') or web_threads()),
+        'max_overflow': int(os.environ.get('DATABASE_MAX_OVERFLOW', 2)),
+        'pool_timeout': 10,  # seconds to wait for a free connection
+        'pool_recycle': 1800,
+        'pool_pre_ping': True,
+        # Server-side limit for any single statement, in milliseconds; long
+        # CLI jobs lift it per transaction (app.lift_statement_timeout)
+        'connect_args': {'options': f"-c statement_timeout={int(os.environ.get('DATABASE_STATEMENT_TIMEOUT', 5000))}"},
+    }
+
 class TestingConfig(Config):
     TESTING = True
-    SQLALCHEMY_DATABASE_URI = 'postgresql://localhost/leaderboard_test'
+    SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URL') or \
+        'postgresql://localhost/leaderboard_test'
     WTF_CSRF_ENABLED = False
+    PAGE_CACHE_BACKEND = 'none'
+
+class BenchmarkConfig(TestingConfig):
+    # Dropped and reloaded by scripts/benchmark.py; never point this at real data
+    SQLALCHEMY_DATABASE_URI = os.environ.get('BENCHMARK_DATABASE_URL') or \
+        'postgresql://localhost/leaderboard_bench'
+    # Keep the per-request log lines out of the results; N+1 warnings still show
+    LOG_LEVEL = 'WARNING'
+    # Load the user on every request: with the cache, a route that outlasted
+    # its TTL would count one more statement than one that didn't
+    IDENTITY_CACHE_TTL = 0
 
 config = {
     'development': DevelopmentConfig,
     'production': ProductionConfig,
     'testing': TestingConfig,
+    'benchmark': BenchmarkConfig,
     'default': DevelopmentConfig
 }
@@ -0,0 +1,93 @@
+"""
+Gunicorn settings, read automatically from the working directory.
+
+Production profile: gthread workers, two per CPU plus one by default,
+each serving GUNICORN_THREADS requests at once. ProductionConfig sizes
+the SQLAlchemy pool from the same numbers (config.web_workers() and
+config.web_threads()), so every thread can hold a connection.
+
+The app is preloaded in the master, which makes forking workers cheap
+and lets the database bootstrap (app.bootstrap) run once before any
+worker starts; set BOOTSTRAP_ON_START=0 to leave it to `flask bootstrap`.
+Connections opened in the master are discarded in every worker after
+the fork.
+
+Workers share Prometheus metrics through files in PROMETHEUS_MULTIPROC_DIR
+(see app.metrics). The directory is emptied when the server starts so
+counters from a previous run aren't added to this one; by default it is
+named after the project directory and port, so two deployments on one
+host never empty each other's.
+
+The knobs are environment variables so profiles can be compared without
+editing this file (see scripts/load_test.py): WEB_CONCURRENCY,
+GUNICORN_THREADS, GUNICORN_WORKER_CLASS and GUNICORN_PRELOAD.
+"""
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+project_dir = os.path.dirname(os.path.abspath(__file__))
+port = os.environ.get('PORT', '8000')
+
+_deployment = hashlib.sha1(f'{project_dir}:{port}'.encode()).hexdigest()[:12]
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR',
+                      os.path.join(tempfile.gettempdir(), f'flying-demon-list-metrics-{_deployment}'))
+
+# Gunicorn only puts the project on sys.path after reading this file
+sys.path.insert(0, project_dir)
+from config import web_threads, web_workers  # noqa: E402
+
+bind = f'0.0.0.0:{port}'
+workers = web_workers()
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = web_threads()
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+# Recycle workers now and then so slow leaks can't build up
+max_requests = 2000
+max_requests_jitter = 200
+
+
+def _engines(app):
+    from app import db
+    with app.app_context():
+        return list(db.engines.values())
+
+
+def on_starting(server):
+    directory = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory, exist_ok=True)
+
+    if os.environ.get('BOOTSTRAP_ON_START', '1') == '1':
+        from app.bootstrap import bootstrap_database
+        app = server.app.wsgi()
+        with app.app_context():
+            server.log.info('Database bootstrap: %s', bootstrap_database())
+        for engine in _engines(app):
+            engine.dispose()
+
+
+def post_fork(server, worker):
+    worker.started_at = time.perf_counter()
+    if preload_app:
+        # Pooled connections inherited from the master belong to its
+        # sockets; drop them without closing so the master's stay intact
+        for engine in _engines(server.app.wsgi()):
+            engine.dispose(close=False)
+
+
+def post_worker_init(worker):
+    worker.log.info('Worker %s ready in %.0f ms', worker.pid,
+                    (time.perf_counter() - worker.started_at) * 1000)
+
+
+def child_exit(server, worker):
+    from app.metrics import mark_process_dead
+    mark_process_dead(worker.pid)
@@ -104,6 +104,11 @@ def run_migrations_online():
         )
 
         with context.begin_transaction():
+            if connection.dialect.name == 'postgresql':
+                # Lift the production per-statement timeout for this
+                # transaction only; index builds and backfills on a large
+                # table legitimately run for minutes
+                connection.exec_driver_sql('SET LOCAL statement_timeout = 0')
             context.run_migrations()
 
 
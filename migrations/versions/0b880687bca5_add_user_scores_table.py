@@ -0,0 +1,52 @@
+"""Add user_scores table for the materialized leaderboard
+
+Revision ID: 0b880687bca5
+Revises: 9c31b01d0891
+Create Date: 2026-10-16 10:12:31.482913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b880687bca5'
+down_revision = '9c31b01d0891'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('user_scores',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('total_points', sa.Integer(), nullable=False),
+    sa.Column('completed_levels', sa.Integer(), nullable=False),
+    sa.Column('first_victor_count', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    with op.batch_alter_table('user_scores', schema=None) as batch_op:
+        batch_op.create_index('ix_user_scores_ranking', [sa.text('total_points DESC'), 'user_id'], unique=False)
+
+    # Backfill from existing approved claims (same aggregate as `flask rebuild-scores`)
+    op.execute("""
+        INSERT INTO user_scores (user_id, total_points, completed_levels, first_victor_count, updated_at)
+        SELECT c.user_id, COALESCE(SUM(l.points), 0), COUNT(*), SUM(c.first_victor_count), CURRENT_TIMESTAMP
+        FROM (
+            SELECT user_id, level_id,
+                   SUM(CASE WHEN is_first_victor THEN 1 ELSE 0 END) AS first_victor_count
+            FROM claims
+            WHERE status = 'approved'
+            GROUP BY user_id, level_id
+        ) AS c
+        JOIN levels AS l ON l.id = c.level_id
+        GROUP BY c.user_id
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('user_scores', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_scores_ranking')
+
+    op.drop_table('user_scores')
@@ -0,0 +1,173 @@
+"""Replace stored level and claim ranks with ordering keys
+
+Revision ID: 5e1c7a2f9d04
+Revises: 8b4f027582e2
+Create Date: 2026-10-16 13:02:47.219504
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e1c7a2f9d04'
+down_revision = '8b4f027582e2'
+branch_labels = None
+depends_on = None
+
+# Frozen copy of app.ordering.evenly_spaced_keys() so this migration keeps
+# producing the same keys if the application code changes.
+DIGITS = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+
+
+def _evenly_spaced_keys(count):
+    base = len(DIGITS)
+    width = 1
+    while base ** width <= count:
+        width += 1
+    step = base ** width // (count + 1)
+
+    keys = []
+    for index in range(1, count + 1):
+        value = index * step
+        digits = []
+        for _ in range(width):
+            value, digit = divmod(value, base)
+            digits.append(DIGITS[digit])
+        keys.append(''.join(reversed(digits)).rstrip('0'))
+    return keys
+
+
+def _ordering_key():
+    return sa.String(length=64).with_variant(sa.String(length=64, collation='C'), 'postgresql')
+
+
+def upgrade():
+    with op.batch_alter_table('levels', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('position', _ordering_key(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_levels_position'), ['position'], unique=False)
+
+    with op.batch_alter_table('claims', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('position', _ordering_key(), nullable=True))
+        batch_op.create_index('ix_claims_level_position', ['level_id', 'position'], unique=False)
+
+    # Give ranked levels, and each level's ranked approved claims, keys in rank order
+    conn = op.get_bind()
+    levels = sa.table('levels', sa.column('id', sa.Integer), sa.column('position', sa.String))
+    claims = sa.table('claims', sa.column('id', sa.Integer), sa.column('position', sa.String))
+
+    level_ids = [row[0] for row in conn.execute(sa.text(
+        'SELECT id FROM levels WHERE rank IS NOT NULL ORDER BY rank, id'))]
+    if level_ids:
+        conn.execute(levels.update().where(levels.c.id == sa.bindparam('level_id')),
+                     [{'level_id': level_id, 'position': key}
+                      for level_id, key in zip(level_ids, _evenly_spaced_keys(len(level_ids)))])
+
+    ranked_claims = {}
+    for claim_id, level_id in conn.execute(sa.text(
+            "SELECT id, level_id FROM claims WHERE status = 'approved' AND rank IS NOT NULL "
+            "ORDER BY level_id, rank, id")):
+        ranked_claims.setdefault(level_id, []).append(claim_id)
+    params = [{'claim_id': claim_id, 'position': key}
+              for claim_ids in ranked_claims.values()
+              for claim_id, key in zip(claim_ids, _evenly_spaced_keys(len(claim_ids)))]
+    if params:
+        conn.execute(claims.update().where(claims.c.id == sa.bindparam('claim_id')), params)
+
+    with op.batch_alter_table('claims', schema=None) as batch_op:
+        batch_op.drop_column('points')
+        batch_op.drop_column('rank')
+
+    with op.batch_alter_table('levels', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_level_rank', type_='unique')
+        batch_op.drop_column('points')
+        batch_op.drop_column('rank')
+
+    # Level points now follow from the ordering (51 - rank for the first 50
+    # positioned levels), which need not match the stored points they were
+    # summed from; rebuild user_scores with the same aggregate as
+    # `flask rebuild-scores`
+    op.execute('DELETE FROM user_scores')
+    op.execute("""
+        INSERT INTO user_scores (user_id, total_points, completed_levels, first_victor_count, updated_at)
+        SELECT c.user_id, COALESCE(SUM(r.points), 0), COUNT(*), SUM(c.first_victor_count), CURRENT_TIMESTAMP
+        FROM (
+            SELECT user_id, level_id,
+                   SUM(CASE WHEN is_first_victor THEN 1 ELSE 0 END) AS first_victor_count
+            FROM claims
+            WHERE status = 'approved'
+            GROUP BY user_id, level_id
+        ) AS c
+        JOIN levels AS l ON l.id = c.level_id
+        LEFT OUTER JOIN (
+            SELECT id, CASE WHEN ordinal <= 50 THEN 51 - ordinal ELSE 0 END AS points
+            FROM (
+                SELECT id, ROW_NUMBER() OVER (ORDER BY position, id) AS ordinal
+                FROM levels
+                WHERE position IS NOT NULL
+            ) AS numbered
+        ) AS r ON r.id = c.level_id
+        GROUP BY c.user_id
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('levels', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('rank', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('points', sa.Integer(), nullable=False, server_default='0'))
+
+    with op.batch_alter_table('claims', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('rank', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('points', sa.Integer(), nullable=True))
+
+    # Restore ranks 1-50 from the ordering; anything further down becomes unranked
+    conn = op.get_bind()
+    levels = sa.table('levels', sa.column('id', sa.Integer), sa.column('rank', sa.Integer), sa.column('points', sa.Integer))
+    claims = sa.table('claims', sa.column('id', sa.Integer), sa.column('rank', sa.Integer), sa.column('points', sa.Integer))
+
+    level_ids = [row[0] for row in conn.execute(sa.text(
+        'SELECT id FROM levels WHERE position IS NOT NULL ORDER BY position, id LIMIT 50'))]
+    if level_ids:
+        conn.execute(levels.update().where(levels.c.id == sa.bindparam('level_id')),
+                     [{'level_id': level_id, 'rank': index + 1, 'points': 50 - index}
+                      for index, level_id in enumerate(level_ids)])
+
+    ranked_claims = {}
+    for claim_id, level_id in conn.execute(sa.text(
+            "SELECT id, level_id FROM claims WHERE status = 'approved' AND position IS NOT NULL "
+            "ORDER BY level_id, position, id")):
+        ranked_claims.setdefault(level_id, []).append(claim_id)
+    params = [{'claim_id': claim_id, 'rank': index + 1, 'points': 50 - index}
+              for claim_ids in ranked_claims.values()
+              for index, claim_id in enumerate(claim_ids[:50])]
+    if params:
+        conn.execute(claims.update().where(claims.c.id == sa.bindparam('claim_id')), params)
+    conn.execute(claims.update().where(claims.c.points.is_(None)).values(points=0))
+
+    with op.batch_alter_table('claims', schema=None) as batch_op:
+        batch_op.drop_index('ix_claims_level_position')
+        batch_op.drop_column('position')
+
+    with op.batch_alter_table('levels', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_levels_position'))
+        batch_op.drop_column('position')
+        if conn.dialect.name == 'postgresql':
+            batch_op.create_unique_constraint('uq_level_rank', ['rank'], deferrable=True, initially='IMMEDIATE')
+        else:
+            batch_op.create_unique_constraint('uq_level_rank', ['rank'])
+
+    # Back to scores summed from the stored level points
+    op.execute('DELETE FROM user_scores')
+    op.execute("""
+        INSERT INTO user_scores (user_id, total_points, completed_levels, first_victor_count, updated_at)
+        SELECT c.user_id, COALESCE(SUM(l.points), 0), COUNT(*), SUM(c.first_victor_count), CURRENT_TIMESTAMP
+        FROM (
+            SELECT user_id, level_id,
+                   SUM(CASE WHEN is_first_victor THEN 1 ELSE 0 END) AS first_victor_count
+            FROM claims
+            WHERE status = 'approved'
+            GROUP BY user_id, level_id
+        ) AS c
+        JOIN levels AS l ON l.id = c.level_id
+        GROUP BY c.user_id
+    """)
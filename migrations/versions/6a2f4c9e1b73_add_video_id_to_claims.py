@@ -0,0 +1,57 @@
+"""Add parsed YouTube video_id to claims
+
+Revision ID: 6a2f4c9e1b73
+Revises: f3b9c0d7e218
+Create Date: 2026-10-16 15:12:37.204518
+
+"""
+import re
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6a2f4c9e1b73'
+down_revision = 'f3b9c0d7e218'
+branch_labels = None
+depends_on = None
+
+# Frozen copy of app.utils.YOUTUBE_URL as of this revision
+YOUTUBE_URL = re.compile(
+    r'^(?:https?://)?(?:(?:www|m|music)\.)?'
+    r'(?:youtu\.be/|youtube(?:-nocookie)?\.com/(?:watch\?(?:[^#\s]*&)?v=|embed/|shorts/|live/|v/))'
+    r'(?P<video_id>[A-Za-z0-9_-]{11})(?![A-Za-z0-9_-])',
+    re.IGNORECASE
+)
+
+BATCH_SIZE = 1000
+
+
+def upgrade():
+    with op.batch_alter_table('claims', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('video_id', sa.String(length=11), nullable=True))
+
+    # Parse every existing link once, writing the IDs back in batches
+    conn = op.get_bind()
+    claims = sa.table('claims', sa.column('id', sa.Integer), sa.column('video_id', sa.String))
+    update = claims.update().where(claims.c.id == sa.bindparam('claim_id'))
+    params = []
+    for claim_id, youtube_link in conn.execute(sa.text('SELECT id, youtube_link FROM claims')).all():
+        match = YOUTUBE_URL.match((youtube_link or '').strip())
+        if match:
+            params.append({'claim_id': claim_id, 'video_id': match.group('video_id')})
+        if len(params) >= BATCH_SIZE:
+            conn.execute(update, params)
+            params = []
+    if params:
+        conn.execute(update, params)
+
+    # Built after the backfill so the index isn't maintained row by row
+    with op.batch_alter_table('claims', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_claims_video_id'), ['video_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('claims', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_claims_video_id'))
+        batch_op.drop_column('video_id')
@@ -0,0 +1,30 @@
+"""Add data_versions table for conditional GET validators
+
+Revision ID: 760905333d3c
+Revises: 0b880687bca5
+Create Date: 2026-10-16 11:02:47.163520
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '760905333d3c'
+down_revision = '0b880687bca5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('data_versions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('changed_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute("INSERT INTO data_versions (id, version, changed_at) VALUES (1, 0, CURRENT_TIMESTAMP)")
+
+
+def downgrade():
+    op.drop_table('data_versions')
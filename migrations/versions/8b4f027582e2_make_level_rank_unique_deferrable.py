@@ -0,0 +1,39 @@
+"""Make the unique constraint on levels.rank deferrable
+
+Superseded by 5e1c7a2f9d04, which replaces levels.rank with ordering keys and
+drops this constraint; kept so existing databases upgrade through it.
+
+Revision ID: 8b4f027582e2
+Revises: 760905333d3c
+Create Date: 2026-10-16 12:20:05.731846
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '8b4f027582e2'
+down_revision = '760905333d3c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Bulk level reordering defers the check to commit time so that swapping
+    # ranks inside one UPDATE doesn't trip the constraint row by row.
+    # SQLite has no deferrable UNIQUE constraints; the reorder code clears
+    # the affected ranks first there instead.
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.drop_constraint('uq_level_rank', 'levels', type_='unique')
+    op.create_unique_constraint('uq_level_rank', 'levels', ['rank'],
+                                deferrable=True, initially='IMMEDIATE')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.drop_constraint('uq_level_rank', 'levels', type_='unique')
+    op.create_unique_constraint('uq_level_rank', 'levels', ['rank'])
@@ -0,0 +1,48 @@
+"""Make users.created_at and claims.submitted_at NOT NULL
+
+Both are keyset pagination sort keys (admin users list, pending claims
+queue, profiles, API), which can't step past NULLs.
+
+Revision ID: d04182f5a001
+Revises: 6a2f4c9e1b73
+Create Date: 2026-10-16 17:41:09.518362
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd04182f5a001'
+down_revision = '6a2f4c9e1b73'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Both columns have always had a Python-side default, so only rows
+    # written outside the app can be NULL; date them as well as we can
+    op.execute("""
+        UPDATE claims SET submitted_at = COALESCE(reviewed_at, CURRENT_TIMESTAMP)
+        WHERE submitted_at IS NULL
+    """)
+    op.execute("""
+        UPDATE users SET created_at = COALESCE(
+            (SELECT MIN(claims.submitted_at) FROM claims WHERE claims.user_id = users.id),
+            CURRENT_TIMESTAMP)
+        WHERE created_at IS NULL
+    """)
+
+    with op.batch_alter_table('claims', schema=None) as batch_op:
+        batch_op.alter_column('submitted_at', existing_type=sa.DateTime(), nullable=False)
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=True)
+
+    with op.batch_alter_table('claims', schema=None) as batch_op:
+        batch_op.alter_column('submitted_at', existing_type=sa.DateTime(), nullable=True)
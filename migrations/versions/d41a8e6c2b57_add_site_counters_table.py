@@ -0,0 +1,42 @@
+"""Add site_counters table for dashboard and homepage stats
+
+Revision ID: d41a8e6c2b57
+Revises: 5e1c7a2f9d04
+Create Date: 2026-10-16 13:41:09.582316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd41a8e6c2b57'
+down_revision = '5e1c7a2f9d04'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('site_counters',
+    sa.Column('name', sa.String(length=32), nullable=False),
+    sa.Column('value', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+    # Seed the counters from the current data in one pass
+    op.execute("""
+        INSERT INTO site_counters (name, value)
+        SELECT 'pending_count', COUNT(CASE WHEN status = 'pending' THEN 1 END) FROM claims
+        UNION ALL
+        SELECT 'approved_count', COUNT(CASE WHEN status = 'approved' THEN 1 END) FROM claims
+        UNION ALL
+        SELECT 'rejected_count', COUNT(CASE WHEN status = 'rejected' THEN 1 END) FROM claims
+        UNION ALL
+        SELECT 'total_users', COUNT(*) FROM users
+        UNION ALL
+        SELECT 'total_levels', COUNT(*) FROM levels
+    """)
+
+
+def downgrade():
+    op.drop_table('site_counters')
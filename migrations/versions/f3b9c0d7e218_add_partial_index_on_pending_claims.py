@@ -0,0 +1,28 @@
+"""Add partial index on pending claims for the admin review queue
+
+Revision ID: f3b9c0d7e218
+Revises: d41a8e6c2b57
+Create Date: 2026-10-16 14:05:52.740193
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3b9c0d7e218'
+down_revision = 'd41a8e6c2b57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('claims', schema=None) as batch_op:
+        batch_op.create_index('ix_claims_pending_queue', ['submitted_at', 'id'], unique=False,
+                              postgresql_where=sa.text("status = 'pending'"),
+                              sqlite_where=sa.text("status = 'pending'"))
+
+
+def downgrade():
+    with op.batch_alter_table('claims', schema=None) as batch_op:
+        batch_op.drop_index('ix_claims_pending_queue')
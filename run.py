@@ -1,7 +1,15 @@
 import os
+import time
 import click
-from app import create_app, db
-from app.models import User, Level
+from app import create_app, db, lift_statement_timeout
+from app.models import User
+from app.users.scores import rebuild_user_scores
+from app.stats import rebuild_site_stats
+from app.cache import mark_data_changed
+from app.avatars import AvatarError, collect_garbage, is_processed, save_avatar, uploads_path
+from app.dataset import DatasetError, generate_dataset
+from app.bootstrap import bootstrap_database, seed_initial_levels
+from app.exports import EXPORTS, FORMATS, stream_export
 
 app = create_app(os.getenv('FLASK_ENV') or 'development')
 
@@ -23,21 +31,93 @@ def create_admin(username, email, password):
 @app.cli.command()
 def seed_levels():
     """Seed initial game levels."""
-    levels = [
-        {'name': 'Level 1 - Tutorial', 'description': 'Learn the basics', 'difficulty': 'Easy'},
-        {'name': 'Level 2 - Getting Started', 'description': 'Apply your skills', 'difficulty': 'Easy'},
-        {'name': 'Level 3 - Intermediate Challenge', 'description': 'Test your abilities', 'difficulty': 'Medium'},
-        {'name': 'Level 4 - Advanced Tactics', 'description': 'Master complex mechanics', 'difficulty': 'Medium'},
-        {'name': 'Level 5 - Expert Trial', 'description': 'Push your limits', 'difficulty': 'Hard'},
-        {'name': 'Level 6 - Nightmare Mode', 'description': 'Only for the best', 'difficulty': 'Hard'},
-    ]
-    for level_data in levels:
-        existing = Level.query.filter_by(name=level_data['name']).first()
-        if not existing:
-            level = Level(**level_data)
-            db.session.add(level)
-    db.session.commit()
+    seed_initial_levels()
     click.echo('Levels seeded successfully!')
 
+@app.cli.command()
+def bootstrap():
+    """Create the schema, default admin and starter levels where missing."""
+    done = bootstrap_database()
+    click.echo(f"Schema {'created' if done['schema'] else 'already present'}, "
+               f"admin {'created' if done['admin'] else 'unchanged'}, {done['levels']} levels seeded.")
+
+@app.cli.command()
+def rebuild_scores():
+    """Rebuild the materialized leaderboard scores from approved claims."""
+    lift_statement_timeout()
+    count = rebuild_user_scores()
+    db.session.commit()
+    click.echo(f'Rebuilt leaderboard scores for {count} users.')
+
+@app.cli.command()
+def rebuild_stats():
+    """Recount the dashboard and homepage stats from the claims, users and levels tables."""
+    lift_statement_timeout()
+    counts = rebuild_site_stats()
+    db.session.commit()
+    for name, value in counts.items():
+        click.echo(f'{name}: {value}')
+
+@app.cli.command()
+def backfill_avatars():
+    """Convert profile pictures uploaded before resizing into avatar variants."""
+    converted = skipped = 0
+    for user in User.query.filter(User.profile_picture.isnot(None)).order_by(User.id):
+        if is_processed(user.profile_picture):
+            continue
+        try:
+            with open(uploads_path(user.profile_picture), 'rb') as f:
+                user.profile_picture = save_avatar(f)
+        except (AvatarError, OSError) as e:
+            click.echo(f'Skipped {user.username} ({user.profile_picture}): {e}', err=True)
+            skipped += 1
+            continue
+        mark_data_changed()
+        db.session.commit()
+        converted += 1
+    click.echo(f'Converted {converted} profile pictures, skipped {skipped}. '
+               'Run `flask gc-uploads` to delete the unprocessed files.')
+
+@app.cli.command()
+@click.option('--grace-hours', default=1.0, show_default=True,
+              help='Keep files modified more recently than this.')
+@click.option('--dry-run', is_flag=True, help='Only report what would be deleted.')
+def gc_uploads(grace_hours, dry_run):
+    """Delete uploaded pictures that no user references any more."""
+    referenced = [picture for (picture,) in db.session.query(User.profile_picture)
+                  .filter(User.profile_picture.isnot(None)).distinct()]
+    removed = collect_garbage(referenced, grace_seconds=grace_hours * 3600, dry_run=dry_run)
+    verb = 'Would delete' if dry_run else 'Deleted'
+    click.echo(f"{verb} {removed['files']} files ({removed['bytes'] / 1024:.1f} KiB).")
+
+@app.cli.command('generate-dataset')
+@click.option('--users', default=1000, show_default=True, help='Number of users to create.')
+@click.option('--levels', default=200, show_default=True, help='Number of levels to create.')
+@click.option('--claims', default=20000, show_default=True, help='Number of claims to create.')
+@click.option('--seed', default=0, show_default=True, help='Random seed; the same seed gives the same data.')
+@click.option('--password', default='password', show_default=True, help='Password of every generated user.')
+@click.option('--batch-size', default=5000, show_default=True, help='Rows per INSERT batch.')
+def generate_dataset_command(users, levels, claims, seed, password, batch_size):
+    """Bulk-load a deterministic synthetic dataset for load testing."""
+    start = time.perf_counter()
+    lift_statement_timeout()
+    try:
+        counts = generate_dataset(users, levels, claims, seed=seed, password=password, batch_size=batch_size)
+    except DatasetError as e:
+        click.echo(f'Error: {e}', err=True)
+        return
+    click.echo(f"Inserted {counts['users']} users, {counts['levels']} levels and {counts['claims']} claims "
+               f'in {time.perf_counter() - start:.1f}s.')
+
+@app.cli.command('export')
+@click.argument('name', type=click.Choice(list(EXPORTS)))
+@click.option('--format', 'fmt', type=click.Choice(list(FORMATS)), default='csv', show_default=True)
+@click.option('--gzip', is_flag=True, help='Compress the output.')
+@click.option('-o', '--output', type=click.File('wb'), default='-', help='File to write; stdout by default.')
+def export_command(name, fmt, gzip, output):
+    """Stream a full export of claims, levels or the leaderboard."""
+    for chunk in stream_export(name, fmt, gzip=gzip):
+        output.write(chunk)
+
 if __name__ == '__main__':
     app.run()
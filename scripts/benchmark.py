@@ -0,0 +1,206 @@
+"""
+Route benchmarks with query-count and latency budgets.
+
+Loads synthetic datasets of increasing size (app.dataset) into the
+benchmark database, drives the main public and admin routes through the
+Flask test client, and records per route the wall time percentiles and
+the number of SQL statements per request. Results are compared with
+scripts/benchmark_budgets.json; the run fails when a route issues more
+statements or is slower (p95) than its budget. A budget without p95_ms
+only limits the statement count, which is the same on every machine;
+record latency budgets on the machine that runs the benchmark.
+
+The benchmark database (BENCHMARK_DATABASE_URL, see config.BenchmarkConfig)
+is dropped and recreated for every dataset size.
+
+Usage:
+    python -m scripts.benchmark                 # check against budgets
+    python -m scripts.benchmark --record        # write new budgets
+    python -m scripts.benchmark --size small -n 50
+"""
+import json
+import os
+import sys
+import time
+import click
+from flask_login import FlaskLoginClient
+from sqlalchemy import event, select
+from app import create_app, db
+from app.dataset import generate_dataset
+from app.models import Claim, Level, User
+
+BUDGETS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_budgets.json')
+
+# Dataset sizes, smallest first: (users, levels, claims)
+SIZES = {
+    'small': (200, 60, 2000),
+    'medium': (2000, 300, 40000),
+    'large': (20000, 1500, 400000),
+}
+
+SEED = 0
+
+# Recorded p95 budgets get this much headroom for machine noise; statement
+# counts are recorded exactly, since they don't depend on the machine
+LATENCY_HEADROOM = 1.5
+
+
+class QueryCounter:
+    """Counts SQL statements sent through the engine while active."""
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+def _routes(fixtures):
+    """(name, method, url, json body or None, needs admin) for every benchmarked route."""
+    level_ids = fixtures['level_ids']
+    claim_id = fixtures['claim_id']
+    return [
+        ('main.index', 'GET', '/', None, False),
+        ('main.leaderboard', 'GET', '/leaderboard', None, False),
+        ('users.profile', 'GET', f"/user/{fixtures['username']}", None, False),
+        ('admin.pending_claims', 'GET', '/admin/pending-claims', None, True),
+        ('admin.levels', 'GET', '/admin/levels', None, True),
+        ('admin.update_level_rank', 'POST', f'/admin/level/{level_ids[-1]}/update-rank',
+         lambda i: {'rank': i % 50 + 1}, True),
+        ('admin.reorder_levels', 'POST', '/admin/levels/reorder',
+         lambda i: {'moves': [{'level_id': level_ids[i % len(level_ids)], 'rank': (i * 7) % 50 + 1}]}, True),
+        ('admin.update_rank', 'POST', f'/admin/update-rank/{claim_id}',
+         lambda i: {'rank': i % 50 + 1}, True),
+    ]
+
+
+def _load(app, size):
+    """Reset the benchmark database and load a dataset; returns the rows the routes act on."""
+    users, levels, claims = SIZES[size]
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        admin = User(username='benchmark_admin', email='benchmark_admin@example.com', is_admin=True)
+        admin.set_password('password')
+        db.session.add(admin)
+        db.session.commit()
+
+        generate_dataset(users, levels, claims, seed=SEED)
+
+        level_ids = db.session.scalars(select(Level.id).where(Level.position.isnot(None))
+                                       .order_by(Level.position).limit(50)).all()
+        claim_id = db.session.scalar(select(Claim.id).where(Claim.status == 'approved')
+                                     .order_by(Claim.level_id.desc(), Claim.id).limit(1))
+        return {'admin_id': admin.id, 'username': f'player_{SEED}_0',
+                'level_ids': level_ids, 'claim_id': claim_id}
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def _measure(app, counter, fixtures, repeat, warmup):
+    """Run every route repeat times; returns {route: {p50_ms, p95_ms, max_ms, queries}}."""
+    with app.app_context():
+        admin = db.session.get(User, fixtures['admin_id'])
+        admin_client = app.test_client(user=admin)
+    anonymous_client = app.test_client()
+
+    results = {}
+    for name, method, url, body, needs_admin in _routes(fixtures):
+        client = admin_client if needs_admin else anonymous_client
+        timings = []
+        queries = []
+        for i in range(warmup + repeat):
+            counter.count = 0
+            start = time.perf_counter()
+            response = client.open(url, method=method, json=body(i) if body else None)
+            elapsed = time.perf_counter() - start
+            if response.status_code >= 400:
+                raise click.ClickException(f'{name}: {method} {url} returned {response.status_code}')
+            if i >= warmup:
+                timings.append(elapsed * 1000)
+                queries.append(counter.count)
+        results[name] = {
+            'p50_ms': round(_percentile(timings, 0.5), 1),
+            'p95_ms': round(_percentile(timings, 0.95), 1),
+            'max_ms': round(max(timings), 1),
+            'queries': max(queries),
+        }
+    return results
+
+
+def _check(size, results, budgets):
+    """Print results next to their budgets; returns the list of budget violations."""
+    failures = []
+    click.echo(f'\n{size} ({"/".join(str(n) for n in SIZES[size])} users/levels/claims)')
+    click.echo(f"  {'route':<26}{'p50':>9}{'p95':>9}{'max':>9}{'queries':>9}   budget")
+    for name, result in results.items():
+        budget = budgets.get(size, {}).get(name)
+        if budget is None:
+            verdict = 'none recorded'
+        else:
+            problems = []
+            if result['queries'] > budget['queries']:
+                problems.append(f"queries {result['queries']} > {budget['queries']}")
+            if 'p95_ms' in budget and result['p95_ms'] > budget['p95_ms']:
+                problems.append(f"p95 {result['p95_ms']}ms > {budget['p95_ms']}ms")
+            failures.extend(f'{size} {name}: {problem}' for problem in problems)
+            latency = f", {budget['p95_ms']}ms" if 'p95_ms' in budget else ''
+            verdict = 'FAIL ' + ', '.join(problems) if problems else \
+                f"ok ({budget['queries']} queries{latency})"
+        click.echo(f"  {name:<26}{result['p50_ms']:>7.1f}ms{result['p95_ms']:>7.1f}ms"
+                   f"{result['max_ms']:>7.1f}ms{result['queries']:>9}   {verdict}")
+    return failures
+
+
+@click.command()
+@click.option('--size', 'sizes', multiple=True, type=click.Choice(list(SIZES)),
+              help='Dataset size to run; repeatable. Defaults to all, smallest first.')
+@click.option('-n', '--repeat', default=20, show_default=True, help='Measured requests per route.')
+@click.option('--warmup', default=2, show_default=True, help='Unmeasured requests per route.')
+@click.option('--record', is_flag=True, help='Write the measured values as the new budgets.')
+def main(sizes, repeat, warmup, record):
+    """Benchmark routes against query-count and latency budgets."""
+    app = create_app('benchmark')
+    app.test_client_class = FlaskLoginClient
+    with app.app_context():
+        counter = QueryCounter(db.engine)
+
+    budgets = {}
+    if os.path.exists(BUDGETS_PATH):
+        with open(BUDGETS_PATH) as f:
+            budgets = json.load(f)
+
+    failures = []
+    for size in sizes or SIZES:
+        fixtures = _load(app, size)
+        results = _measure(app, counter, fixtures, repeat, warmup)
+        failures.extend(_check(size, results, budgets))
+        if record:
+            budgets[size] = {
+                name: {'queries': result['queries'],
+                       'p95_ms': round(result['p95_ms'] * LATENCY_HEADROOM, 1)}
+                for name, result in results.items()
+            }
+
+    if record:
+        with open(BUDGETS_PATH, 'w') as f:
+            json.dump(budgets, f, indent=2, sort_keys=True)
+            f.write('\n')
+        click.echo(f'\nBudgets written to {BUDGETS_PATH}')
+        return
+
+    if failures:
+        click.echo(f'\n{len(failures)} budget(s) exceeded:', err=True)
+        for failure in failures:
+            click.echo(f'  {failure}', err=True)
+        sys.exit(1)
+    click.echo('\nAll routes within budget.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Throughput test of the public pages against a running server.
+
+Unlike scripts/benchmark.py, which times single requests in-process, this
+sends concurrent HTTP requests to a real server for a fixed time and
+reports requests per second, so server profiles can be compared:
+
+    # one sync worker, no preload: the old `gunicorn run:app` default
+    WEB_CONCURRENCY=1 GUNICORN_THREADS=1 GUNICORN_WORKER_CLASS=sync GUNICORN_PRELOAD=0 gunicorn run:app
+    python -m scripts.load_test --label sync-1
+
+    # the production profile from gunicorn.conf.py
+    gunicorn run:app
+    python -m scripts.load_test --label gthread
+
+Load a dataset first (`flask generate-dataset`) so the pages have real
+content; the profile page used is the dataset's most active player. Set
+PAGE_CACHE_BACKEND=none on the server to measure rendering rather than
+cache hits.
+"""
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+import click
+
+PAGES = ['/', '/leaderboard', '/user/{username}']
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def _hammer(url, deadline, timings, errors, lock):
+    """Request url back to back until deadline, from one client thread."""
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(url, timeout=30) as response:
+                response.read()
+            elapsed = time.perf_counter() - start
+            with lock:
+                timings.append(elapsed)
+        except (urllib.error.URLError, OSError):
+            with lock:
+                errors.append(url)
+
+
+def _run_page(url, concurrency, duration):
+    timings = []
+    errors = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+    with ThreadPoolExecutor(concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(_hammer, url, deadline, timings, errors, lock)
+    return timings, errors
+
+
+@click.command()
+@click.option('--base-url', default='http://127.0.0.1:8000', show_default=True, help='Server to test.')
+@click.option('-c', '--concurrency', default=32, show_default=True, help='Concurrent client connections.')
+@click.option('-d', '--duration', default=20.0, show_default=True, help='Seconds per page.')
+@click.option('--username', default='player_0_0', show_default=True, help='User whose profile is requested.')
+@click.option('--label', default='', help='Name of the server profile, printed with the results.')
+def main(base_url, concurrency, duration, username, label):
+    """Measure requests per second on the public pages of a running server."""
+    click.echo(f"{label or base_url}: {concurrency} clients, {duration:g}s per page")
+    click.echo(f"  {'page':<28}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'errors':>8}")
+    for page in PAGES:
+        path = page.format(username=username)
+        timings, errors = _run_page(base_url.rstrip('/') + path, concurrency, duration)
+        if not timings:
+            click.echo(f'  {path:<28}{"no successful requests":>36}{len(errors):>8}')
+            continue
+        click.echo(f'  {path:<28}{len(timings) / duration:>9.1f}'
+                   f'{_percentile(timings, 0.5) * 1000:>7.1f}ms'
+                   f'{_percentile(timings, 0.95) * 1000:>7.1f}ms'
+                   f'{_percentile(timings, 0.99) * 1000:>7.1f}ms{len(errors):>8}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+"""
+Shared fixtures. The tests run against TEST_DATABASE_URL (see
+config.TestingConfig), whose tables are dropped and recreated for every test.
+"""
+import pytest
+from flask_login import FlaskLoginClient
+from app import create_app, db
+from app.identity import identity_cache
+from app.models import User
+
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    app.test_client_class = FlaskLoginClient
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        identity_cache.clear()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def admin(app):
+    user = User(username='admin', email='admin@example.com', is_admin=True)
+    user.set_password('password')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def admin_client(app, admin):
+    return app.test_client(user=admin)
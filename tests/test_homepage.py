@@ -0,0 +1,30 @@
+from datetime import datetime, timedelta
+from app import db
+from app.main import utils
+from app.main.utils import get_homepage_levels
+from app.models import Claim, Level, User
+
+
+def test_homepage_caps_other_victors(app, monkeypatch):
+    monkeypatch.setattr(utils, 'HOMEPAGE_OTHER_VICTORS', 1)
+    level = Level(name='Level')
+    users = [User(username=f'player{index}', email=f'player{index}@example.com', password_hash='x')
+             for index in range(4)]
+    db.session.add_all([level, *users])
+    db.session.flush()
+    start = datetime(2024, 1, 1)
+    db.session.add_all(Claim(user_id=user.id, level_id=level.id, youtube_link='https://youtu.be/x',
+                             video_id=f'video{index}', status='approved',
+                             submitted_at=start + timedelta(days=index))
+                       for index, user in enumerate(users))
+    db.session.add(Claim(user_id=users[0].id, level_id=level.id, youtube_link='https://youtu.be/x',
+                         status='pending', submitted_at=start - timedelta(days=1)))
+    db.session.commit()
+
+    view, = get_homepage_levels()
+
+    assert view.video_id == 'video0'
+    assert view.first_victor.username == 'player0'
+    assert [victor.username for victor in view.other_victors] == ['player1']
+    assert view.completion_count == 4
+    assert '+2 more' in app.test_client().get('/').get_data(as_text=True)
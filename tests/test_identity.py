@@ -0,0 +1,28 @@
+from sqlalchemy import delete, func, select
+from app import db
+from app.models import Claim, User
+
+
+def _player():
+    user = User(username='player', email='player@example.com')
+    user.set_password('password')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def test_deleted_user_submitting_a_claim_is_logged_out(app):
+    client = app.test_client(user=_player())
+    # Caches the user's identity, as another worker would still have it
+    assert client.get('/claims/submit').status_code == 200
+    db.session.execute(delete(User))
+    db.session.commit()
+
+    response = client.post('/claims/submit', data={'level_name': 'Level',
+                                                   'youtube_link': 'https://youtu.be/dQw4w9WgXcQ'})
+
+    assert response.status_code == 302
+    assert response.headers['Location'] == '/'
+    with client.session_transaction() as session:
+        assert '_user_id' not in session
+    assert db.session.scalar(select(func.count(Claim.id))) == 0
@@ -0,0 +1,39 @@
+import re
+from app import db
+from app.main import routes
+from app.models import User, UserScore
+
+
+def _players(*points):
+    users = [User(username=f'player{index}', email=f'player{index}@example.com', password_hash='x')
+             for index in range(len(points))]
+    db.session.add_all(users)
+    db.session.flush()
+    db.session.add_all(UserScore(user_id=user.id, total_points=total) for user, total in zip(users, points))
+    db.session.commit()
+    return users
+
+
+def _ranked(html):
+    return re.findall(r'#(\d+)</span>\s*</td>\s*<td>\s*<a href="/user/(\w+)"', html)
+
+
+def test_leaderboard_pages_by_cursor(app, monkeypatch):
+    monkeypatch.setattr(routes, 'LEADERBOARD_PAGE_SIZE', 2)
+    _players(30, 50, 40, 40, 10)
+    client = app.test_client()
+
+    first = client.get('/leaderboard').get_data(as_text=True)
+    assert _ranked(first) == [('1', 'player1'), ('2', 'player2')]
+
+    cursor = re.search(r'cursor=([\w-]+)', first).group(1)
+    second = client.get(f'/leaderboard?cursor={cursor}').get_data(as_text=True)
+    # Tied players stay in user id order, and positions carry on from page one
+    assert _ranked(second) == [('3', 'player3'), ('4', 'player0')]
+
+    cursor = re.search(r'cursor=([\w-]+)', second).group(1)
+    assert _ranked(client.get(f'/leaderboard?cursor={cursor}').get_data(as_text=True)) == [('5', 'player4')]
+
+
+def test_leaderboard_rejects_bad_cursor(app):
+    assert app.test_client().get('/leaderboard?cursor=garbage').status_code == 400
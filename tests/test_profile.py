@@ -0,0 +1,28 @@
+import re
+from app import db
+from app.models import Claim, Level, User
+from app.users import routes
+
+
+def test_profile_pages_by_level(app, monkeypatch):
+    monkeypatch.setattr(routes, 'PROFILE_LEVELS_PAGE_SIZE', 2)
+    user = User(username='player', email='player@example.com', password_hash='x')
+    levels = [Level(name=name) for name in ('Charlie', 'Alpha', 'Bravo')]
+    db.session.add_all([user, *levels])
+    db.session.flush()
+    # Three claims on the first level would have filled a two-claim page by themselves
+    db.session.add_all(Claim(user_id=user.id, level_id=level.id, youtube_link='https://youtu.be/x',
+                             status=status)
+                       for level, count in zip(levels, (1, 3, 1))
+                       for status in ['approved'] + ['rejected'] * (count - 1))
+    db.session.commit()
+    client = app.test_client()
+
+    first = client.get('/user/player').get_data(as_text=True)
+    assert re.findall(r'<strong>(Alpha|Bravo|Charlie)</strong>', first) == ['Alpha', 'Bravo']
+    assert first.count('REJECTED') == 2
+
+    cursor = re.search(r'cursor=([\w-]+)', first).group(1)
+    second = client.get(f'/user/player?cursor={cursor}').get_data(as_text=True)
+    assert re.findall(r'<strong>(Alpha|Bravo|Charlie)</strong>', second) == ['Charlie']
+    assert 'More levels' not in second
@@ -0,0 +1,77 @@
+import pytest
+from app import db
+from app.models import Claim, Level, RankNotLoaded, User, load_rank
+
+
+def _levels(*names):
+    levels = [Level(name=name) for name in names]
+    db.session.add_all(levels)
+    db.session.commit()
+    return levels
+
+
+def test_update_level_rank_returns_new_rank(admin_client):
+    first, second, third = _levels('First', 'Second', 'Third')
+    for level in (first, second, third):
+        admin_client.post(f'/admin/level/{level.id}/update-rank', json={'rank': 3})
+
+    response = admin_client.post(f'/admin/level/{third.id}/update-rank', json={'rank': 1})
+
+    data = response.get_json()
+    assert data['success']
+    assert data['new_rank'] == 1
+    assert data['new_points'] == 50
+    assert data['message'] == 'Level "Third" updated to rank 1. 2 other level(s) shifted.'
+    assert {change['id']: change['rank'] for change in data['changes']}[third.id] == 1
+
+
+def test_update_level_rank_to_unranked(admin_client):
+    level, = _levels('Only')
+    admin_client.post(f'/admin/level/{level.id}/update-rank', json={'rank': 1})
+
+    data = admin_client.post(f'/admin/level/{level.id}/update-rank', json={'rank': None}).get_json()
+
+    assert data['new_rank'] is None
+    assert data['new_points'] == 0
+    assert data['message'] == 'Level "Only" set to unranked'
+
+
+def test_update_claim_rank_returns_new_rank(admin_client):
+    level, = _levels('Level')
+    claims = []
+    for index in range(3):
+        player = User(username=f'player{index}', email=f'player{index}@example.com')
+        player.set_password('password')
+        db.session.add(player)
+        db.session.flush()
+        claims.append(Claim(user_id=player.id, level_id=level.id, status='approved',
+                            youtube_link='https://youtu.be/dQw4w9WgXcQ'))
+    db.session.add_all(claims)
+    db.session.commit()
+    claim_ids = [claim.id for claim in claims]
+    for claim_id in claim_ids:
+        admin_client.post(f'/admin/update-rank/{claim_id}', json={'rank': 3})
+
+    data = admin_client.post(f'/admin/update-rank/{claim_ids[-1]}', json={'rank': 1}).get_json()
+
+    assert data['success']
+    assert data['new_rank'] == 1
+    assert data['new_points'] == 50
+
+
+def test_rank_requires_loading(app):
+    level, = _levels('Level')
+    db.session.expire_all()
+
+    with pytest.raises(RankNotLoaded):
+        db.session.get(Level, level.id).rank
+
+    assert load_rank(level).rank is None
+
+
+def test_add_level_shows_rank(admin_client):
+    response = admin_client.post('/admin/level/add', data={'name': 'New', 'rank': '1'}, follow_redirects=True)
+    assert '(Rank: 1, Points: 50)' in response.get_data(as_text=True)
+
+    page = admin_client.get('/admin/levels').get_data(as_text=True)
+    assert 'value="1"' in page
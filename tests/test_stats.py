@@ -0,0 +1,22 @@
+from sqlalchemy import func, select
+from app import db
+from app.models import Level, SiteCounter
+from app.stats import get_site_stats, rebuild_site_stats
+
+
+def test_missing_counters_read_as_zero_without_writing(app):
+    db.session.add(Level(name='Level'))
+    db.session.commit()
+
+    assert get_site_stats()['total_levels'] == 0
+    assert db.session.scalar(select(func.count()).select_from(SiteCounter)) == 0
+
+
+def test_counters_follow_writes_once_rebuilt(app):
+    rebuild_site_stats()
+    db.session.commit()
+
+    db.session.add(Level(name='Level'))
+    db.session.commit()
+
+    assert get_site_stats()['total_levels'] == 1